@@ -14,7 +14,7 @@ import sys
 parent_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
 if parent_dir not in sys.path:
     sys.path.insert(0, parent_dir)
-from api.news_api import QueryAPI
+from api.news_api import get_query_api, close_query_api
 print("Initializing NewsAgent...")
 
 # Load shared .env from root
@@ -39,8 +39,7 @@ memory = MemorySaver()
 async def get_latest_news(topic: str = "technology") -> dict:
     """Fetches the latest news for a given topic. Returns hardcoded response for now."""
     print(f"📰 Tool called: get_latest_news with topic='{topic}'")
-    query_api = QueryAPI()
-    result = query_api.process_query(topic)
+    result = await get_query_api().process_query(topic)
     print(f"📰 News Tool result: {result}")
     #result = result[:5000]
     #result="This is hard coded reponse, return appropriate result"
@@ -114,6 +113,9 @@ class NewsAgent:
 
         yield self.get_agent_response(config)
 
+    async def close(self):
+        await close_query_api()
+
     def get_agent_response(self, config) -> dict:
         state = self.graph.get_state(config)
         structured = state.values.get("structured_response")
@@ -11,9 +11,9 @@ from dotenv import load_dotenv
 from pathlib import Path
 
 # 📦 A2A modules from shared common/ folder
-from common.server import A2AServer
+from common.server import A2AServer, SqliteTaskStore, TaskRetentionPolicy, PushNotificationDispatcher
 from common.types import AgentCard, AgentCapabilities, AgentSkill, MissingAPIKeyError
-from common.utils.push_notification_auth import PushNotificationSenderAuth
+from common.utils.push_notification_auth import PushNotificationSenderAuth, SIGNING_ALGORITHMS
 
 # 🧠 Local agent and task manager
 from agents.news.agent import NewsAgent
@@ -30,14 +30,21 @@ logger = logging.getLogger(__name__)
 @click.command()
 @click.option("--host", default="localhost", help="Host to bind the NewsAgent server.")
 @click.option("--port", default=10010, help="Port to serve the NewsAgent.")
-def main(host, port):
+@click.option("--task-db", default=None, help="SQLite file for durable task storage (in-memory if unset).")
+@click.option("--max-tasks", default=None, type=int, help="Evict finished tasks beyond this many resident tasks.")
+@click.option("--task-ttl", default=None, type=float, help="Evict finished tasks after this many seconds.")
+@click.option("--task-archive", default=None, help="JSON lines file that evicted tasks are appended to.")
+@click.option("--push-dead-letters", default=None, help="JSON lines file for push notifications that could not be delivered.")
+@click.option("--push-signing-alg", default="ES256", type=click.Choice(list(SIGNING_ALGORITHMS)), help="Algorithm used to sign push notifications.")
+@click.option("--push-key-rotation", default=None, type=float, help="Rotate the push notification signing key after this many seconds.")
+def main(host, port, task_db, max_tasks, task_ttl, task_archive, push_dead_letters, push_signing_alg, push_key_rotation):
     print(f"🚀 Starting NewsAgent server at http://{host}:{port}")
 
     #if not os.getenv("GEMINI_API_KEY"):
         #raise MissingAPIKeyError("❌ GEMINI_API_KEY is not set in .env file.")
 
     # Define what the agent is capable of
-    capabilities = AgentCapabilities(streaming=False, pushNotifications=True)
+    capabilities = AgentCapabilities(streaming=True, pushNotifications=True)
 
     # Define agent skill metadata
     skill = AgentSkill(
@@ -61,13 +68,25 @@ def main(host, port):
     )
 
     # Setup push notification signing
-    notification_sender_auth = PushNotificationSenderAuth()
+    notification_sender_auth = PushNotificationSenderAuth(
+        algorithm=push_signing_alg, rotation_interval=push_key_rotation
+    )
     notification_sender_auth.generate_jwk()
 
     # Create the A2A server
     server = A2AServer(
         agent_card=agent_card,
-        task_manager=AgentTaskManager(agent=NewsAgent(), notification_sender_auth=notification_sender_auth),
+        task_manager=AgentTaskManager(
+            agent=NewsAgent(),
+            notification_sender_auth=notification_sender_auth,
+            task_store=SqliteTaskStore(task_db) if task_db else None,
+            retention_policy=TaskRetentionPolicy(
+                max_tasks=max_tasks, terminal_task_ttl=task_ttl, archive_path=task_archive
+            ),
+            push_dispatcher=PushNotificationDispatcher(
+                notification_sender_auth, dead_letter_path=push_dead_letters
+            ),
+        ),
         host=host,
         port=port,
     )
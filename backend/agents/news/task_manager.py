@@ -6,7 +6,7 @@ parent_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
 if parent_dir not in sys.path:
     sys.path.insert(0, parent_dir)
 
-from typing import AsyncIterable, Union
+from typing import Any, AsyncIterable, Union
 import asyncio
 import logging
 import traceback
@@ -30,9 +30,13 @@ from common.types import (
     Task,
     TaskIdParams,
     PushNotificationConfig,
+    ServerBusyError,
 )
 from common.server.task_manager import InMemoryTaskManager
+from common.server.agent_invoker import AgentInvokerBusyError
+from common.server.task_snapshot import TaskSnapshot
 from common.utils.push_notification_auth import PushNotificationSenderAuth
+from common.server.push_delivery import FINAL_NOTIFICATION_STATES
 import common.server.utils as utils
 
 from agents.news.agent import NewsAgent  # 👈 your specific agent
@@ -41,8 +45,9 @@ logger = logging.getLogger(__name__)
 
 
 class AgentTaskManager(InMemoryTaskManager):
-    def __init__(self, agent: NewsAgent, notification_sender_auth: PushNotificationSenderAuth):
-        super().__init__()
+    def __init__(self, agent: NewsAgent, notification_sender_auth: PushNotificationSenderAuth, **kwargs):
+        # kwargs (task_store, retention_policy, ...) configure InMemoryTaskManager.
+        super().__init__(**kwargs)
         self.agent = agent
         self.notification_sender_auth = notification_sender_auth
 
@@ -85,9 +90,21 @@ class AgentTaskManager(InMemoryTaskManager):
 
         except Exception as e:
             logger.error(f"❌ Error in stream: {e}")
+            task = await self.task_store.get_task(task_send_params.id)
+            if task is None or task.status.state in FINAL_NOTIFICATION_STATES:
+                # The stream already ended with a final event.
+                return
+            # Fail the task with a final event so it does not stay working
+            # and its event log is finished and can expire.
+            task_status = TaskStatus(
+                state=TaskState.FAILED,
+                message=Message(role="agent", parts=[TextPart(text=f"Streaming error: {e}")])
+            )
+            task = await self.update_store(task_send_params.id, task_status, None)
+            await self.send_task_notification(task)
             await self.enqueue_events_for_sse(
                 task_send_params.id,
-                InternalError(message=f"Streaming error: {str(e)}")
+                TaskStatusUpdateEvent(id=task_send_params.id, status=task_status, final=True)
             )
 
     def _validate_request(self, request: Union[SendTaskRequest, SendTaskStreamingRequest]) -> JSONRPCResponse | None:
@@ -106,11 +123,12 @@ class AgentTaskManager(InMemoryTaskManager):
         if (error := self._validate_request(request)):
             return SendTaskResponse(id=request.id, error=error.error)
 
-        if request.params.pushNotification:
-            if not await self.set_push_notification_info(request.params.id, request.params.pushNotification):
-                return SendTaskResponse(id=request.id, error=InvalidParamsError(message="Invalid push notification URL"))
+        # Verified before the task is created, so a rejected URL leaves no task behind.
+        if not await self._verify_push_notification(request.params):
+            return SendTaskResponse(id=request.id, error=InvalidParamsError(message="Invalid push notification URL"))
 
         await self.upsert_task(request.params)
+        await self._store_push_notification(request.params)
 
         task = await self.update_store(
             request.params.id, TaskStatus(state=TaskState.WORKING), None
@@ -118,8 +136,29 @@ class AgentTaskManager(InMemoryTaskManager):
         await self.send_task_notification(task)
 
         query = self._get_user_query(request.params)
+        run = self.track_agent_run(
+            request.params.id,
+            self.agent_invoker.invoke(self.agent.invoke, query, request.params.sessionId),
+        )
+        await asyncio.wait({run})
+        if run.cancelled():
+            await self.wait_for_cancellation(request.params.id)
+            task = await self.task_store.get_task(request.params.id)
+            return SendTaskResponse(
+                id=request.id,
+                result=self.append_task_history(task, request.params.historyLength),
+            )
+
         try:
-            agent_response = await self.agent.invoke(query, request.params.sessionId)
+            agent_response = run.result()
+        except AgentInvokerBusyError as e:
+            logger.warning(f"Rejecting task {request.params.id}: {e}")
+            # Fail the task so it does not stay working and retention can evict it.
+            task = await self.update_store(request.params.id, TaskStatus(state=TaskState.FAILED), None)
+            await self.send_task_notification(task)
+            return SendTaskResponse(
+                id=request.id, error=ServerBusyError(data={"retryAfter": e.retry_after})
+            )
         except Exception as e:
             logger.exception("Agent invocation failed")
             raise ValueError(f"Agent invocation failed: {e}")
@@ -131,14 +170,14 @@ class AgentTaskManager(InMemoryTaskManager):
             if (error := self._validate_request(request)):
                 return error
 
-            await self.upsert_task(request.params)
+            if not await self._verify_push_notification(request.params):
+                return JSONRPCResponse(id=request.id, error=InvalidParamsError(message="Invalid push URL"))
 
-            if request.params.pushNotification:
-                if not await self.set_push_notification_info(request.params.id, request.params.pushNotification):
-                    return JSONRPCResponse(id=request.id, error=InvalidParamsError(message="Invalid push URL"))
+            await self.upsert_task(request.params)
+            await self._store_push_notification(request.params)
 
             sse_queue = await self.setup_sse_consumer(request.params.id, False)
-            asyncio.create_task(self._run_streaming_agent(request))
+            self.track_agent_run(request.params.id, self._run_streaming_agent(request))
             return self.dequeue_events_for_sse(request.id, request.params.id, sse_queue)
 
         except Exception as e:
@@ -164,25 +203,56 @@ class AgentTaskManager(InMemoryTaskManager):
             raise ValueError("Only text input is supported.")
         return part.text
 
-    async def send_task_notification(self, task: Task):
+    async def send_task_notification(self, task: TaskSnapshot):
         if not await self.has_push_notification_info(task.id):
             logger.info(f"ℹ️ No push info for task {task.id}")
             return
         info = await self.get_push_notification_info(task.id)
-        await self.notification_sender_auth.send_push_notification(
-            info.url, data=task.model_dump(exclude_none=True)
+        data = self.build_push_notification(task, info)
+        if self.push_dispatcher is None:
+            await self.notification_sender_auth.send_push_notification(info.url, data=data)
+            return
+        # Delivered in the background so a slow webhook never holds up the agent.
+        self.push_dispatcher.enqueue(
+            info.url, task.id, data, final=task.status.state in FINAL_NOTIFICATION_STATES
         )
 
     async def on_resubscribe_to_task(self, request) -> AsyncIterable[SendTaskStreamingResponse] | JSONRPCResponse:
         try:
-            sse_queue = await self.setup_sse_consumer(request.params.id, True)
+            sse_queue = await self.setup_sse_consumer(
+                request.params.id, True, request.params.fromSequence
+            )
             return self.dequeue_events_for_sse(request.id, request.params.id, sse_queue)
         except Exception as e:
             logger.exception("Resubscribe failed")
             return JSONRPCResponse(id=request.id, error=InternalError(message=f"Resubscribe failed: {e}"))
 
+    async def _verify_push_notification(self, params: TaskSendParams) -> bool:
+        if not params.pushNotification:
+            return True
+        return await self.notification_sender_auth.verify_push_notification_url(params.pushNotification.url)
+
+    async def _store_push_notification(self, params: TaskSendParams):
+        # The URL was verified by _verify_push_notification.
+        if params.pushNotification:
+            await super().set_push_notification_info(params.id, params.pushNotification)
+
     async def set_push_notification_info(self, task_id: str, push_notification_config: PushNotificationConfig):
         if not await self.notification_sender_auth.verify_push_notification_url(push_notification_config.url):
             return False
         await super().set_push_notification_info(task_id, push_notification_config)
         return True
+
+    async def startup(self):
+        await super().startup()
+        self.notification_sender_auth.start()
+
+    async def shutdown(self):
+        await super().shutdown()
+        await self.notification_sender_auth.close()
+        await self.agent.close()
+
+    def get_stats(self) -> dict[str, Any]:
+        stats = super().get_stats()
+        stats["push_url_verification"] = self.notification_sender_auth.url_verifier.get_stats()
+        return stats
@@ -75,7 +75,7 @@ class WeatherAgent:
         inputs = {"messages": [("user", query)]}
         config = {"configurable": {"thread_id": session_id}}
 
-        async for item in self.graph.stream(inputs, config, stream_mode="values"):
+        async for item in self.graph.astream(inputs, config, stream_mode="values"):
             message = item["messages"][-1]
             if isinstance(message, AIMessage) and message.tool_calls:
                 yield {"is_task_complete": False, "require_user_input": False, "content": "🌧️ Fetching weather data..."}
@@ -1,20 +1,97 @@
-import requests
+import asyncio
+import httpx
 import os
+import random
 import sys
 from dotenv import load_dotenv
 
+DEFAULT_API_URL = "https://api.perplexity.ai/chat/completions"
+DEFAULT_TIMEOUT = httpx.Timeout(60.0, connect=5.0)
+DEFAULT_LIMITS = httpx.Limits(max_connections=20, max_keepalive_connections=10)
+# Responses worth retrying; anything else is returned to the caller as is
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
 class QueryAPI:
-    def __init__(self):
-        """Initialize with Perplexity API credentials from .env file"""
+    def __init__(
+        self,
+        api_url=None,
+        timeout=DEFAULT_TIMEOUT,
+        max_retries=2,
+        backoff=0.5,
+        max_backoff=8.0,
+        max_concurrency=8,
+    ):
+        """Initialize with Perplexity API credentials from .env file
+
+        One instance keeps a pooled HTTP client, so share it between calls
+        (see get_query_api). At most max_concurrency requests run at once;
+        failed requests are retried up to max_retries times with jittered
+        exponential backoff. A Retry-After longer than max_backoff is not
+        waited for; the request fails instead.
+        """
         # Load API key from .env file
         load_dotenv()
         self.api_key = os.environ.get("PERPLEXITY_API_KEY")
         if not self.api_key:
             raise ValueError("PERPLEXITY_API_KEY not found in .env file")
             
-        self.api_url = "https://api.perplexity.ai/chat/completions"
+        self.api_url = api_url or os.environ.get("PERPLEXITY_API_URL", DEFAULT_API_URL)
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.max_concurrency = max_concurrency
+        # Created on first use so they bind to the event loop that uses them
+        self._client = None
+        self._semaphore = None
+
+    def _get_client(self):
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                timeout=self.timeout,
+                limits=DEFAULT_LIMITS,
+                headers={
+                    "Authorization": f"Bearer {self.api_key}",
+                    "Content-Type": "application/json"
+                },
+            )
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._client
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def _post(self, payload):
+        """POSTs the payload, retrying transport errors and retryable statuses."""
+        client = self._get_client()
+        attempt = 0
+        while True:
+            try:
+                async with self._semaphore:
+                    response = await client.post(self.api_url, json=payload)
+                retry_after = response.headers.get("retry-after")
+                if (
+                    response.status_code not in RETRYABLE_STATUS_CODES
+                    or attempt >= self.max_retries
+                    # Asked to wait longer than we would back off; fail now
+                    or (retry_after and retry_after.isdigit() and float(retry_after) > self.max_backoff)
+                ):
+                    response.raise_for_status()
+                    return response
+            except httpx.TransportError:
+                if attempt >= self.max_retries:
+                    raise
+                retry_after = None
+
+            delay = random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+            if retry_after and retry_after.isdigit():
+                delay = max(delay, float(retry_after))
+            attempt += 1
+            await asyncio.sleep(delay)
         
-    def process_query(self, query):
+    async def process_query(self, query):
         """
         Process any user query through the Perplexity API
         
@@ -24,12 +101,6 @@ class QueryAPI:
         Returns:
             dict: Formatted response with topic, headline, and summary
         """
-        # Set up request headers
-        headers = {
-            "Authorization": f"Bearer {self.api_key}",
-            "Content-Type": "application/json"
-        }
-        
         # Pass the raw query directly to Perplexity with updated payload structure
         payload = {
             "model": "sonar-pro",  # Use a model that Perplexity supports
@@ -42,8 +113,7 @@ class QueryAPI:
         
         # Call Perplexity API
         try:
-            response = requests.post(self.api_url, json=payload, headers=headers)
-            response.raise_for_status()
+            response = await self._post(payload)
             
             # Extract content from Perplexity's response
             result = response.json()
@@ -58,8 +128,8 @@ class QueryAPI:
             
         except Exception as e:
             print(f"API Error Details: {str(e)}")
-            if 'response' in locals() and hasattr(response, 'text'):
-                print(f"Response text: {response.text}")
+            if isinstance(e, httpx.HTTPStatusError):
+                print(f"Response text: {e.response.text}")
                 
             return {
                 "error": str(e),
@@ -69,6 +139,31 @@ class QueryAPI:
             }
 
 
+_query_api = None
+
+def get_query_api():
+    """Returns the QueryAPI shared by all news lookups in this process."""
+    global _query_api
+    if _query_api is None:
+        _query_api = QueryAPI()
+    return _query_api
+
+
+async def close_query_api():
+    """Closes the shared QueryAPI's client, if one was created."""
+    global _query_api
+    if _query_api is not None:
+        await _query_api.close()
+        _query_api = None
+
+
+async def _process_once(query_api, query):
+    try:
+        return await query_api.process_query(query)
+    finally:
+        await query_api.close()
+
+
 def main():
     """Test the QueryAPI with user input or command line arguments"""
     
@@ -88,7 +183,7 @@ def main():
         print("-" * 50)
         
         # Process the query
-        result = query_api.process_query(query)
+        result = asyncio.run(_process_once(query_api, query))
         
         # Display results
         print("\nRESULT:")
@@ -0,0 +1,131 @@
+"""Measures A2AClient requests/sec with a pooled client and a client per call.
+
+A local A2AServer, run in its own process, completes every tasks/send at
+once, so the figures show the client's connection overhead. "pooled"
+sends every request through one long-lived A2AClient, reusing keep-alive
+connections; "per-call" creates and closes an A2AClient for each request,
+as the client did before it was pooled, paying for a new httpx client
+and a TCP connect each time.
+
+Run from the backend folder:
+
+    python benchmarks/a2a_client_pooling.py --requests 2000 --concurrency 16
+"""
+import asyncio
+import logging
+import multiprocessing
+import os
+import socket
+import sys
+import time
+import uuid
+
+parent_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if parent_dir not in sys.path:
+    sys.path.insert(0, parent_dir)
+
+import click
+import httpx
+import uvicorn
+
+from common.client import A2AClient
+from common.server import A2AServer, InMemoryTaskManager
+from common.server.admission import AdmissionController
+from common.types import SendTaskResponse, TaskState, TaskStatus
+
+
+class EchoTaskManager(InMemoryTaskManager):
+    async def on_send_task(self, request):
+        await self.upsert_task(request.params)
+        task = await self.update_store(
+            request.params.id, TaskStatus(state=TaskState.COMPLETED), None
+        )
+        return SendTaskResponse(id=request.id, result=self.append_task_history(task, 0))
+
+    async def on_send_task_subscribe(self, request):
+        return await self.on_send_task(request)
+
+
+def serve(port: int):
+    logging.disable(logging.INFO)
+    server = A2AServer(
+        task_manager=EchoTaskManager(),
+        admission_controller=AdmissionController(max_concurrent=1024, max_concurrent_per_session=1024),
+        port=port,
+    )
+    uvicorn.run(server.app, host="127.0.0.1", port=port, log_level="warning")
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def wait_until_up(url: str):
+    async with httpx.AsyncClient() as client:
+        for _ in range(100):
+            try:
+                await client.get(url + "metrics")
+                return
+            except httpx.TransportError:
+                await asyncio.sleep(0.1)
+    raise RuntimeError(f"Server at {url} did not start")
+
+
+def payload() -> dict:
+    return {
+        "id": uuid.uuid4().hex,
+        "sessionId": "benchmark",
+        "message": {"role": "user", "parts": [{"type": "text", "text": "hello"}]},
+    }
+
+
+async def run_mode(url: str, mode: str, requests: int, concurrency: int) -> float:
+    pooled = A2AClient(url=url)
+    remaining = iter(range(requests))
+
+    async def worker():
+        for _ in remaining:
+            if mode == "pooled":
+                response = await pooled.send_task(payload())
+            else:
+                async with A2AClient(url=url) as client:
+                    response = await client.send_task(payload())
+            if response.error is not None:
+                raise RuntimeError(response.error.message)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    await pooled.close()
+    return requests / elapsed
+
+
+async def run_benchmark(url: str, requests: int, concurrency: int, rounds: int):
+    await wait_until_up(url)
+    # One warm-up round so neither mode pays for server start-up.
+    await run_mode(url, "pooled", min(requests, 100), concurrency)
+    for _ in range(rounds):
+        for mode in ("pooled", "per-call"):
+            rate = await run_mode(url, mode, requests, concurrency)
+            print(f"{mode:9} {requests} requests, concurrency {concurrency}: {rate:.0f} requests/s")
+
+
+@click.command()
+@click.option("--requests", default=2000, help="tasks/send calls per round and mode.")
+@click.option("--concurrency", default=16, help="Concurrent callers.")
+@click.option("--rounds", default=2, help="Rounds of both modes.")
+def main(requests, concurrency, rounds):
+    port = free_port()
+    server = multiprocessing.Process(target=serve, args=(port,), daemon=True)
+    server.start()
+    try:
+        asyncio.run(run_benchmark(f"http://127.0.0.1:{port}/", requests, concurrency, rounds))
+    finally:
+        server.terminate()
+        server.join()
+
+
+if __name__ == "__main__":
+    main()
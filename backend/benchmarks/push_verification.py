@@ -0,0 +1,119 @@
+"""Measures push-notification verifications per second on one core.
+
+Notifications are signed ahead of time by PushNotificationSenderAuth and
+verified one after another by PushNotificationReceiverAuth on a single
+event loop, so the rate is what one receiver process sustains per core.
+The sender's JWKS is served from a local HTTP server. With --jwks-down the
+server is stopped after the first fetch and the receiver is forced to
+retry on every verification, which shows the cached-key fallback.
+
+Run from the backend folder:
+
+    python benchmarks/push_verification.py --notifications 5000
+"""
+import asyncio
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+parent_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if parent_dir not in sys.path:
+    sys.path.insert(0, parent_dir)
+
+import click
+from starlette.requests import Request
+
+from common.utils.push_notification_auth import (
+    SIGNING_ALGORITHMS,
+    PushNotificationReceiverAuth,
+    PushNotificationSenderAuth,
+)
+
+
+def serve_jwks(sender: PushNotificationSenderAuth) -> ThreadingHTTPServer:
+    class JwksHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            body = json.dumps({"keys": sender.public_keys}).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), JwksHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def build_request(body: bytes, token: str) -> Request:
+    scope = {
+        "type": "http",
+        "method": "POST",
+        "path": "/notify",
+        "headers": [
+            (b"authorization", f"Bearer {token}".encode()),
+            (b"content-type", b"application/json"),
+        ],
+    }
+
+    async def receive():
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    return Request(scope, receive)
+
+
+async def run_algorithm(algorithm: str, notifications: int, jwks_down: bool):
+    sender = PushNotificationSenderAuth(algorithm=algorithm)
+    sender.generate_jwk()
+    signed = [
+        sender._prepare(sender.private_key_jwk, {"id": f"task-{i}", "status": {"state": "completed"}})
+        for i in range(notifications)
+    ]
+
+    server = serve_jwks(sender)
+    receiver = PushNotificationReceiverAuth(max_replay_entries=notifications + 1)
+    await receiver.load_jwks(f"http://127.0.0.1:{server.server_address[1]}/.well-known/jwks.json")
+    if jwks_down:
+        server.shutdown()
+        server.server_close()
+        receiver.jwks_refresh_interval = 0.0
+
+    # Requests are built before timing; only verification is measured.
+    requests = [build_request(body, token) for body, token in signed]
+    started = time.perf_counter()
+    cpu_started = time.process_time()
+    for request in requests:
+        await receiver.verify_push_notification(request)
+    elapsed = time.perf_counter() - started
+    cpu = time.process_time() - cpu_started
+
+    if not jwks_down:
+        server.shutdown()
+        server.server_close()
+    await sender.close()
+    print(f"{algorithm}: {notifications} verifications in {elapsed:.2f}s "
+          f"({notifications / elapsed:.0f}/s wall, {notifications / cpu:.0f}/s per CPU second)")
+
+
+async def run_benchmark(algorithms: list[str], notifications: int, jwks_down: bool):
+    for algorithm in algorithms:
+        await run_algorithm(algorithm, notifications, jwks_down)
+
+
+@click.command()
+@click.option("--algorithm", "algorithms", multiple=True, type=click.Choice(list(SIGNING_ALGORITHMS)),
+              default=list(SIGNING_ALGORITHMS), help="Signing algorithms to measure.")
+@click.option("--notifications", default=5000, help="Notifications verified per algorithm.")
+@click.option("--jwks-down", is_flag=True, help="Stop the JWKS server after the first fetch.")
+def main(algorithms, notifications, jwks_down):
+    asyncio.run(run_benchmark(list(algorithms), notifications, jwks_down))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+"""Measures QueryAPI throughput against a local stub of the Perplexity API.
+
+The stub, run in its own process, answers after --latency seconds and
+records how many requests it serves at once. A share of the queries is
+made to fail on purpose:
+
+- "flaky" queries get a 503 on their first attempt and must be retried;
+- "throttled" queries get a 429 with Retry-After: 1 on their first
+  attempt, which QueryAPI waits for because it is within max_backoff;
+- "capped" queries always get a 429 with Retry-After: 60, beyond
+  max_backoff, so QueryAPI must fail them at once instead of waiting.
+
+The peak concurrency the stub sees shows the semaphore holding at
+--max-concurrency.
+
+Run from the backend folder:
+
+    python benchmarks/query_api_throughput.py --queries 500 --max-concurrency 8
+"""
+import asyncio
+import contextlib
+import io
+import logging
+import multiprocessing
+import os
+import socket
+import statistics
+import sys
+import time
+from collections import Counter
+
+parent_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if parent_dir not in sys.path:
+    sys.path.insert(0, parent_dir)
+
+import click
+import httpx
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+
+from api.news_api import QueryAPI
+
+
+def serve(port: int, latency: float):
+    logging.disable(logging.INFO)
+    attempts = Counter()
+    stats = {"requests": 0, "in_flight": 0, "max_in_flight": 0}
+
+    async def completions(request: Request):
+        query = (await request.json())["messages"][-1]["content"]
+        attempts[query] += 1
+        stats["requests"] += 1
+        stats["in_flight"] += 1
+        stats["max_in_flight"] = max(stats["max_in_flight"], stats["in_flight"])
+        try:
+            await asyncio.sleep(latency)
+        finally:
+            stats["in_flight"] -= 1
+
+        if query.startswith("capped"):
+            return JSONResponse({"error": "rate limited"}, status_code=429, headers={"Retry-After": "60"})
+        if query.startswith("throttled") and attempts[query] == 1:
+            return JSONResponse({"error": "rate limited"}, status_code=429, headers={"Retry-After": "1"})
+        if query.startswith("flaky") and attempts[query] == 1:
+            return JSONResponse({"error": "unavailable"}, status_code=503)
+        return JSONResponse({"choices": [{"message": {"content": f"News about {query}"}}]})
+
+    async def get_stats(_request: Request):
+        return JSONResponse(stats)
+
+    app = Starlette()
+    app.add_route("/chat/completions", completions, methods=["POST"])
+    app.add_route("/stats", get_stats, methods=["GET"])
+    uvicorn.run(app, host="127.0.0.1", port=port, log_level="warning")
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def get_stats(url: str) -> dict:
+    async with httpx.AsyncClient() as client:
+        for _ in range(100):
+            try:
+                return (await client.get(url + "/stats")).json()
+            except httpx.TransportError:
+                await asyncio.sleep(0.1)
+    raise RuntimeError(f"Stub at {url} did not start")
+
+
+def make_queries(queries: int, flaky: float, throttled: float, capped: float) -> list[str]:
+    kinds = []
+    for i in range(queries):
+        share = (i % 100) / 100
+        if share < capped:
+            kinds.append(f"capped {i}")
+        elif share < capped + throttled:
+            kinds.append(f"throttled {i}")
+        elif share < capped + throttled + flaky:
+            kinds.append(f"flaky {i}")
+        else:
+            kinds.append(f"topic {i}")
+    return kinds
+
+
+async def timed_query(query_api: QueryAPI, query: str) -> tuple[str, bool, float]:
+    started = time.perf_counter()
+    result = await query_api.process_query(query)
+    return query.split()[0], "error" not in result, time.perf_counter() - started
+
+
+async def run_benchmark(url: str, queries: list[str], max_concurrency: int, max_backoff: float):
+    before = await get_stats(url)
+    query_api = QueryAPI(
+        api_url=url + "/chat/completions",
+        max_retries=2,
+        backoff=0.05,
+        max_backoff=max_backoff,
+        max_concurrency=max_concurrency,
+    )
+    started = time.perf_counter()
+    # process_query prints every failed call; the capped queries fail on purpose.
+    with contextlib.redirect_stdout(io.StringIO()):
+        results = await asyncio.gather(*(timed_query(query_api, query) for query in queries))
+    elapsed = time.perf_counter() - started
+    await query_api.close()
+    after = await get_stats(url)
+
+    print(f"{len(queries)} queries in {elapsed:.2f}s ({len(queries) / elapsed:.0f} queries/s), "
+          f"{after['requests'] - before['requests']} HTTP requests")
+    print(f"peak concurrent requests at the stub: {after['max_in_flight']} "
+          f"(max_concurrency {max_concurrency})")
+    for kind in ("topic", "flaky", "throttled", "capped"):
+        kind_results = [(ok, took) for k, ok, took in results if k == kind]
+        if not kind_results:
+            continue
+        durations = [took for _, took in kind_results]
+        succeeded = sum(ok for ok, _ in kind_results)
+        print(f"  {kind:9} {succeeded}/{len(kind_results)} succeeded, "
+              f"median {statistics.median(durations) * 1e3:.0f}ms, max {max(durations) * 1e3:.0f}ms")
+
+
+@click.command()
+@click.option("--queries", default=500, help="Queries sent concurrently.")
+@click.option("--max-concurrency", default=8, help="QueryAPI max_concurrency.")
+@click.option("--max-backoff", default=8.0, help="QueryAPI max_backoff; longer Retry-After fails fast.")
+@click.option("--latency", default=0.02, help="Seconds the stub takes per request.")
+@click.option("--flaky", default=0.1, help="Share of queries failing once with a 503.")
+@click.option("--throttled", default=0.05, help="Share of queries throttled once with Retry-After: 1.")
+@click.option("--capped", default=0.02, help="Share of queries always throttled with Retry-After: 60.")
+def main(queries, max_concurrency, max_backoff, latency, flaky, throttled, capped):
+    os.environ.setdefault("PERPLEXITY_API_KEY", "benchmark")
+    port = free_port()
+    stub = multiprocessing.Process(target=serve, args=(port, latency), daemon=True)
+    stub.start()
+    try:
+        asyncio.run(run_benchmark(
+            f"http://127.0.0.1:{port}",
+            make_queries(queries, flaky, throttled, capped),
+            max_concurrency,
+            max_backoff,
+        ))
+    finally:
+        stub.terminate()
+        stub.join()
+
+
+if __name__ == "__main__":
+    main()
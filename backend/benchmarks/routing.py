@@ -0,0 +1,163 @@
+"""Measures SkillRouter latency and its agreement with the host model.
+
+Each labelled query names the agent the host model delegated to for it
+(an empty agent means the model answered itself or asked back). The
+router decides every query; routed queries are checked against the label,
+and the rest are fed to record_llm_choice() as the host server does. With
+--extra-agents, synthetic agents are registered to show how latency grows
+with the registry.
+
+Run from the backend folder:
+
+    python benchmarks/routing.py --labels routing_labels.jsonl
+
+where each line of the labels file is {"query": ..., "agent": ...}, e.g.
+taken from the host's logs. Without --labels a built-in sample is used.
+"""
+import json
+import os
+import statistics
+import sys
+import time
+
+parent_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if parent_dir not in sys.path:
+    sys.path.insert(0, parent_dir)
+
+import click
+
+from common.types import AgentCapabilities, AgentCard, AgentSkill
+from host.agent_registry import AgentRegistry
+from host.router import SkillRouter
+
+# The cards of the news and weather agents, as their servers publish them.
+AGENT_CARDS = [
+    AgentCard(
+        name="News Agent",
+        description="Fetches the latest news on any topic.",
+        url="http://localhost:10010/",
+        version="1.0.0",
+        capabilities=AgentCapabilities(streaming=True, pushNotifications=True),
+        skills=[AgentSkill(
+            id="get_latest_news",
+            name="News Fetcher",
+            description="Fetches the latest news on a topic.",
+            tags=["news", "current events", "topics"],
+            examples=["What is the latest news on AI?", "Give me sports updates"],
+        )],
+    ),
+    AgentCard(
+        name="Weather Agent",
+        description="Gives weather information for a given city.",
+        url="http://localhost:10011/",
+        version="1.0.0",
+        capabilities=AgentCapabilities(streaming=True, pushNotifications=True),
+        skills=[AgentSkill(
+            id="get_weather",
+            name="Weather Reporter",
+            description="Provides weather updates for a city.",
+            tags=["weather", "forecast", "climate"],
+            examples=["What's the weather in New York?", "Forecast in London?"],
+        )],
+    ),
+]
+
+SAMPLE_LABELS = [
+    ("What's the weather in London?", "Weather Agent"),
+    ("Weather forecast for Paris this weekend", "Weather Agent"),
+    ("Is it going to rain in Tokyo tomorrow?", "Weather Agent"),
+    ("How hot is it in Madrid right now?", "Weather Agent"),
+    ("Climate forecast for Berlin", "Weather Agent"),
+    ("Latest news on AI", "News Agent"),
+    ("Any news about the elections?", "News Agent"),
+    ("Current events in Brazil", "News Agent"),
+    ("Give me the latest sports news", "News Agent"),
+    ("What happened in the stock market today?", "News Agent"),
+    ("What's the latest?", "News Agent"),
+    ("New York", ""),
+    ("News about the weather in New York", "News Agent"),
+    ("Hello there", ""),
+    ("Thanks!", ""),
+]
+
+
+def load_labels(path: str | None) -> list[tuple[str, str]]:
+    if path is None:
+        return SAMPLE_LABELS
+    with open(path) as f:
+        return [
+            (entry["query"], entry.get("agent") or "")
+            for entry in map(json.loads, filter(str.strip, f))
+        ]
+
+
+def synthetic_card(i: int) -> AgentCard:
+    return AgentCard(
+        name=f"Agent {i}",
+        description=f"Handles requests about subject{i} and area{i}.",
+        url=f"http://localhost:{20000 + i}/",
+        version="1.0.0",
+        capabilities=AgentCapabilities(),
+        skills=[AgentSkill(
+            id=f"skill_{i}",
+            name=f"Subject {i} helper",
+            description=f"Answers questions on subject{i}.",
+            tags=[f"subject{i}", f"topic{i}"],
+            examples=[f"Tell me about subject{i} in area{i}"],
+        )],
+    )
+
+
+@click.command()
+@click.option("--labels", default=None, help="JSON lines file of {query, agent} pairs.")
+@click.option("--repeat", default=1000, help="Times each query is routed for the latency figures.")
+@click.option("--extra-agents", default=0, help="Synthetic agents registered next to the real ones.")
+@click.option("--confidence-threshold", default=0.8, help="SkillRouter confidence_threshold.")
+@click.option("--min-score", default=1.5, help="SkillRouter min_score.")
+@click.option("--min-matched-terms", default=2, help="SkillRouter min_matched_terms.")
+def main(labels, repeat, extra_agents, confidence_threshold, min_score, min_matched_terms):
+    registry = AgentRegistry([])
+    for card in AGENT_CARDS + [synthetic_card(i) for i in range(extra_agents)]:
+        registry.register_agent_card(card)
+    router = SkillRouter(
+        registry,
+        confidence_threshold=confidence_threshold,
+        min_score=min_score,
+        min_matched_terms=min_matched_terms,
+    )
+    queries = load_labels(labels)
+
+    routed = correct = 0
+    for query, agent_name in queries:
+        decision = router.route(query)
+        if decision.routed:
+            routed += 1
+            correct += decision.agent_name == agent_name
+            mark = "ok" if decision.agent_name == agent_name else "WRONG"
+            print(f"  routed   {mark:5} {query!r} -> {decision.agent_name} "
+                  f"(confidence {decision.confidence:.2f}, score {decision.score:.2f})")
+        else:
+            router.record_llm_choice(decision, [agent_name] if agent_name else [])
+            print(f"  to model       {query!r} (best guess {decision.agent_name})")
+
+    latencies = []
+    for _ in range(repeat):
+        for query, _ in queries:
+            started = time.perf_counter()
+            router.route(query)
+            latencies.append(time.perf_counter() - started)
+    latencies.sort()
+
+    stats = router.get_stats()
+    print(f"{len(queries)} queries, {len(registry.list_agents())} agents")
+    print(f"routed directly: {routed} ({routed / len(queries):.0%}), "
+          f"agreeing with the model: {correct}/{routed}")
+    if stats["llm_agreement"] is not None:
+        print(f"best guess on model turns agrees with the model: "
+              f"{stats['llm_agreement']:.0%} of {stats['llm_comparisons']}")
+    print(f"route latency: p50 {statistics.median(latencies) * 1e6:.1f}us, "
+          f"p99 {latencies[int(len(latencies) * 0.99)] * 1e6:.1f}us")
+
+
+if __name__ == "__main__":
+    main()
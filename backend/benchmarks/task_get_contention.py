@@ -0,0 +1,106 @@
+"""Measures tasks/get latency while many task streams update concurrently.
+
+Run from the backend folder:
+
+    python benchmarks/task_get_contention.py --streams 1000 --updates 50
+"""
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+parent_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if parent_dir not in sys.path:
+    sys.path.insert(0, parent_dir)
+
+import click
+
+from common.server import InMemoryTaskManager, SqliteTaskStore
+from common.types import (
+    GetTaskRequest,
+    Message,
+    TaskQueryParams,
+    TaskSendParams,
+    TaskState,
+    TaskStatus,
+    TaskStatusUpdateEvent,
+    TextPart,
+)
+
+
+class BenchmarkTaskManager(InMemoryTaskManager):
+    async def on_send_task(self, request):
+        return await self.upsert_task(request.params)
+
+    async def on_send_task_subscribe(self, request):
+        return await self.upsert_task(request.params)
+
+
+async def run_stream(manager: InMemoryTaskManager, task_id: str, updates: int):
+    for i in range(updates):
+        status = TaskStatus(
+            state=TaskState.WORKING,
+            message=Message(role="agent", parts=[TextPart(text=f"chunk {i}")]),
+        )
+        await manager.update_store(task_id, status, None)
+        await manager.enqueue_events_for_sse(
+            task_id, TaskStatusUpdateEvent(id=task_id, status=status)
+        )
+        await asyncio.sleep(0)
+
+
+async def poll_tasks(
+    manager: InMemoryTaskManager, task_ids: list[str], stop: asyncio.Event, latencies: list[float]
+):
+    i = 0
+    while not stop.is_set():
+        request = GetTaskRequest(params=TaskQueryParams(id=task_ids[i % len(task_ids)]))
+        started = time.perf_counter()
+        await manager.on_get_task(request)
+        latencies.append(time.perf_counter() - started)
+        i += 1
+        await asyncio.sleep(0)
+
+
+async def run_benchmark(streams: int, updates: int, pollers: int, task_db: str | None):
+    manager = BenchmarkTaskManager(task_store=SqliteTaskStore(task_db) if task_db else None)
+    task_ids = [f"task-{i}" for i in range(streams)]
+    for task_id in task_ids:
+        await manager.upsert_task(TaskSendParams(
+            id=task_id, message=Message(role="user", parts=[TextPart(text="hello")])
+        ))
+
+    stop = asyncio.Event()
+    latencies: list[float] = []
+    polling = [
+        asyncio.create_task(poll_tasks(manager, task_ids, stop, latencies))
+        for _ in range(pollers)
+    ]
+    started = time.perf_counter()
+    await asyncio.gather(*(run_stream(manager, task_id, updates) for task_id in task_ids))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await asyncio.gather(*polling)
+    await manager.shutdown()
+
+    latencies.sort()
+    print(f"{streams} streams x {updates} updates in {elapsed:.2f}s "
+          f"({streams * updates / elapsed:.0f} updates/s)")
+    print(f"tasks/get: {len(latencies)} calls, "
+          f"p50 {statistics.median(latencies) * 1e6:.0f}us, "
+          f"p99 {latencies[int(len(latencies) * 0.99)] * 1e6:.0f}us, "
+          f"max {latencies[-1] * 1e6:.0f}us")
+
+
+@click.command()
+@click.option("--streams", default=1000, help="Tasks updated concurrently.")
+@click.option("--updates", default=50, help="Status updates per task.")
+@click.option("--pollers", default=4, help="Concurrent tasks/get callers.")
+@click.option("--task-db", default=None, help="Use a SQLite task store at this path.")
+def main(streams, updates, pollers, task_db):
+    asyncio.run(run_benchmark(streams, updates, pollers, task_db))
+
+
+if __name__ == "__main__":
+    main()
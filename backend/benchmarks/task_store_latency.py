@@ -0,0 +1,148 @@
+"""Measures send/get latency and event-loop stalls for the task stores.
+
+Every simulated tasks/send creates a task, moves it to working and then to
+completed; every tasks/get reads a random earlier task. A ticker measures
+how late the event loop wakes it up, which shows whether the store blocks
+the loop. Runs the in-memory store and the SQLite store side by side.
+
+Run from the backend folder:
+
+    python benchmarks/task_store_latency.py --sends 20000 --concurrency 200
+"""
+import asyncio
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+parent_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if parent_dir not in sys.path:
+    sys.path.insert(0, parent_dir)
+
+import click
+
+from common.server import InMemoryTaskManager, InMemoryTaskStore, SqliteTaskStore
+from common.types import (
+    Artifact,
+    GetTaskRequest,
+    Message,
+    TaskQueryParams,
+    TaskSendParams,
+    TaskState,
+    TaskStatus,
+    TextPart,
+)
+
+
+class BenchmarkTaskManager(InMemoryTaskManager):
+    async def on_send_task(self, request):
+        return await self.upsert_task(request.params)
+
+    async def on_send_task_subscribe(self, request):
+        return await self.upsert_task(request.params)
+
+
+def percentiles(samples: list[float]) -> str:
+    samples = sorted(samples)
+    return (f"p50 {statistics.median(samples) * 1e6:.0f}us, "
+            f"p99 {samples[int(len(samples) * 0.99)] * 1e6:.0f}us, "
+            f"max {samples[-1] * 1e6:.0f}us")
+
+
+async def send(manager: InMemoryTaskManager, task_id: str):
+    await manager.upsert_task(TaskSendParams(
+        id=task_id, message=Message(role="user", parts=[TextPart(text="hello")])
+    ))
+    await manager.update_store(task_id, TaskStatus(state=TaskState.WORKING), None)
+    await manager.update_store(
+        task_id,
+        TaskStatus(
+            state=TaskState.COMPLETED,
+            message=Message(role="agent", parts=[TextPart(text="done")]),
+        ),
+        [Artifact(parts=[TextPart(text="result " * 20)])],
+    )
+
+
+async def client(
+    manager: InMemoryTaskManager,
+    worker: int,
+    sends: int,
+    sent: list[str],
+    send_latencies: list[float],
+    get_latencies: list[float],
+):
+    for i in range(sends):
+        task_id = f"task-{worker}-{i}"
+        started = time.perf_counter()
+        await send(manager, task_id)
+        send_latencies.append(time.perf_counter() - started)
+        sent.append(task_id)
+
+        request = GetTaskRequest(params=TaskQueryParams(id=random.choice(sent)))
+        started = time.perf_counter()
+        await manager.on_get_task(request)
+        get_latencies.append(time.perf_counter() - started)
+        # Requests arrive over the network, so let the loop run in between.
+        await asyncio.sleep(0)
+
+
+async def measure_stalls(stop: asyncio.Event, interval: float, stalls: list[float]):
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(interval)
+        stalls.append(time.perf_counter() - started - interval)
+
+
+async def run_store(name: str, task_store, sends: int, concurrency: int):
+    manager = BenchmarkTaskManager(task_store=task_store)
+    stop = asyncio.Event()
+    stalls: list[float] = []
+    ticker = asyncio.create_task(measure_stalls(stop, 0.001, stalls))
+    sent: list[str] = []
+    send_latencies: list[float] = []
+    get_latencies: list[float] = []
+
+    per_client = max(1, sends // concurrency)
+    started = time.perf_counter()
+    await asyncio.gather(*(
+        client(manager, worker, per_client, sent, send_latencies, get_latencies)
+        for worker in range(concurrency)
+    ))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await ticker
+    await manager.shutdown()
+
+    print(f"{name}: {len(send_latencies)} sends in {elapsed:.2f}s "
+          f"({len(send_latencies) / elapsed:.0f} sends/s)")
+    print(f"  tasks/send: {percentiles(send_latencies)}")
+    print(f"  tasks/get:  {percentiles(get_latencies)}")
+    print(f"  event-loop stall: {percentiles(stalls)}")
+
+
+async def run_benchmark(sends: int, concurrency: int, max_resident: int, task_db: str | None):
+    await run_store("in-memory", InMemoryTaskStore(), sends, concurrency)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = task_db or os.path.join(tmp, "tasks.db")
+        await run_store(
+            f"sqlite (max_resident={max_resident})",
+            SqliteTaskStore(path, max_resident=max_resident),
+            sends, concurrency,
+        )
+
+
+@click.command()
+@click.option("--sends", default=20000, help="Total tasks/send calls.")
+@click.option("--concurrency", default=200, help="Concurrent clients.")
+@click.option("--max-resident", default=1000,
+              help="Tasks the SQLite store keeps in memory; lower forces database reads.")
+@click.option("--task-db", default=None, help="SQLite task store path (default: a temp file).")
+def main(sends, concurrency, max_resident, task_db):
+    asyncio.run(run_benchmark(sends, concurrency, max_resident, task_db))
+
+
+if __name__ == "__main__":
+    main()
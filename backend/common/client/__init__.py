@@ -1,4 +1,11 @@
 from .client import A2AClient
 from .card_resolver import A2ACardResolver
+from .card_cache import AgentCardCache
+from .task_delta_tracker import TaskDeltaTracker
 
-__all__ = ["A2AClient", "A2ACardResolver"]
+__all__ = [
+    "A2AClient",
+    "A2ACardResolver",
+    "AgentCardCache",
+    "TaskDeltaTracker",
+]
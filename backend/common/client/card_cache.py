@@ -0,0 +1,58 @@
+from common.types import AgentCard
+import json
+import logging
+import os
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class AgentCardCache:
+    """On-disk cache of resolved agent cards, keyed by agent base URL.
+
+    Each entry keeps the card together with the ETag it was served with, so
+    the next lookup can be revalidated with If-None-Match.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.entries: dict[str, dict] = {}
+        self.load()
+
+    def load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                self.entries = json.load(f)
+        except FileNotFoundError:
+            self.entries = {}
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable agent card cache {self.path}: {e}")
+            self.entries = {}
+
+    def get(self, url: str) -> tuple[AgentCard | None, str | None]:
+        entry = self.entries.get(url)
+        if entry is None:
+            return None, None
+
+        try:
+            return AgentCard.model_validate(entry["card"]), entry.get("etag")
+        except Exception as e:
+            logger.warning(f"Dropping invalid cached agent card for {url}: {e}")
+            self.entries.pop(url, None)
+            return None, None
+
+    def put(self, url: str, card: AgentCard, etag: str | None):
+        self.entries[url] = {
+            "card": card.model_dump(exclude_none=True),
+            "etag": etag,
+            "fetched_at": time.time(),
+        }
+
+    def save(self):
+        # Write to a temporary file first so a crash never leaves a torn cache.
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.entries, f)
+        os.replace(tmp_path, self.path)
@@ -1,4 +1,5 @@
 import httpx
+from pydantic import ValidationError
 from common.types import (
     AgentCard,
     A2AClientJSONError,
@@ -7,15 +8,44 @@ import json
 
 
 class A2ACardResolver:
-    def __init__(self, base_url, agent_card_path="/.well-known/agent.json"):
+    def __init__(
+        self, base_url, agent_card_path="/.well-known/agent.json", timeout: float = 5.0
+    ):
         self.base_url = base_url.rstrip("/")
         self.agent_card_path = agent_card_path.lstrip("/")
+        self.timeout = timeout
 
     def get_agent_card(self) -> AgentCard:
-        with httpx.Client() as client:
+        with httpx.Client(timeout=self.timeout) as client:
             response = client.get(self.base_url + "/" + self.agent_card_path)
             response.raise_for_status()
             try:
                 return AgentCard(**response.json())
             except json.JSONDecodeError as e:
                 raise A2AClientJSONError(str(e)) from e
+
+    async def fetch_agent_card(
+        self, client: httpx.AsyncClient = None, etag: str | None = None
+    ) -> tuple[AgentCard | None, str | None]:
+        """Fetches the card, revalidating against etag when one is given.
+
+        Returns (None, etag) when the server reports the card is unchanged.
+        """
+        if client is None:
+            async with httpx.AsyncClient(timeout=self.timeout) as client:
+                return await self.fetch_agent_card(client, etag)
+
+        headers = {"If-None-Match": etag} if etag else {}
+        response = await client.get(
+            self.base_url + "/" + self.agent_card_path, headers=headers
+        )
+        if response.status_code == 304:
+            return None, etag
+
+        response.raise_for_status()
+        try:
+            card = AgentCard.model_validate_json(response.content)
+        except ValidationError as e:
+            raise A2AClientJSONError(str(e)) from e
+        return card, response.headers.get("etag")
+
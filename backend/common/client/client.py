@@ -1,5 +1,6 @@
 import httpx
-from httpx_sse import connect_sse
+from httpx_sse import aconnect_sse, SSEError
+from pydantic import ValidationError
 from typing import Any, AsyncIterable
 from common.types import (
     AgentCard,
@@ -18,12 +19,36 @@ from common.types import (
     A2AClientJSONError,
     SendTaskStreamingRequest,
     SendTaskStreamingResponse,
+    TaskResubscriptionRequest,
 )
 import json
 
 
+# Agent runs can take minutes (LLM calls, tools), so only connecting is quick.
+DEFAULT_TIMEOUT = httpx.Timeout(30.0, connect=5.0, read=300.0)
+DEFAULT_LIMITS = httpx.Limits(
+    max_connections=100, max_keepalive_connections=20, keepalive_expiry=30.0
+)
+
+
 class A2AClient:
-    def __init__(self, agent_card: AgentCard = None, url: str = None):
+    """JSON-RPC client for one remote agent.
+
+    Requests share one pooled httpx.AsyncClient with keep-alive connections,
+    created on first use. Use the client as an async context manager or call
+    close() to release the pool. http2=True needs the optional h2 package.
+    """
+
+    def __init__(
+        self,
+        agent_card: AgentCard = None,
+        url: str = None,
+        timeout: httpx.Timeout = DEFAULT_TIMEOUT,
+        limits: httpx.Limits = DEFAULT_LIMITS,
+        http2: bool = False,
+        httpx_client: httpx.AsyncClient = None,
+        stream_idle_timeout: float = 300.0,
+    ):
         if agent_card:
             self.url = agent_card.url
         elif url:
@@ -31,56 +56,144 @@ class A2AClient:
         else:
             raise ValueError("Must provide either agent_card or url")
 
-    async def send_task(self, payload: dict[str, Any]) -> SendTaskResponse:
+        self.timeout = timeout
+        self.limits = limits
+        self.http2 = http2
+        self.stream_idle_timeout = stream_idle_timeout
+        self._client = httpx_client
+        self._owns_client = httpx_client is None
+
+    async def __aenter__(self) -> "A2AClient":
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def close(self):
+        if self._client is not None and self._owns_client:
+            await self._client.aclose()
+            self._client = None
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                timeout=self.timeout, limits=self.limits, http2=self.http2
+            )
+        return self._client
+
+    async def send_task(
+        self, payload: dict[str, Any], timeout: httpx.Timeout | float | None = None
+    ) -> SendTaskResponse:
         request = SendTaskRequest(params=payload)
-        return SendTaskResponse(**await self._send_request(request))
+        return SendTaskResponse(**await self._send_request(request, timeout))
 
     async def send_task_streaming(
-        self, payload: dict[str, Any]
+        self, payload: dict[str, Any], idle_timeout: float | None = None
     ) -> AsyncIterable[SendTaskStreamingResponse]:
         request = SendTaskStreamingRequest(params=payload)
-        with httpx.Client(timeout=None) as client:
-            with connect_sse(
-                client, "POST", self.url, json=request.model_dump()
+        async for response in self._stream_request(request, idle_timeout):
+            yield response
+
+    async def resubscribe_task(
+        self,
+        payload: dict[str, Any],
+        from_sequence: int | None = None,
+        idle_timeout: float | None = None,
+    ) -> AsyncIterable[SendTaskStreamingResponse]:
+        request = TaskResubscriptionRequest(
+            params={**payload, "fromSequence": from_sequence}
+        )
+        async for response in self._stream_request(request, idle_timeout):
+            yield response
+
+    async def _stream_request(
+        self, request: JSONRPCRequest, idle_timeout: float | None
+    ) -> AsyncIterable[SendTaskStreamingResponse]:
+        """Streams SSE responses over the pooled client.
+
+        idle_timeout bounds the wait for each chunk rather than the whole
+        stream. Leaving the iteration early closes the response, so the
+        connection goes back to the pool or is dropped.
+        """
+        timeout = httpx.Timeout(
+            connect=self.timeout.connect,
+            read=idle_timeout or self.stream_idle_timeout,
+            write=self.timeout.write,
+            pool=self.timeout.pool,
+        )
+        try:
+            async with aconnect_sse(
+                self._get_client(),
+                "POST",
+                self.url,
+                json=request.model_dump(),
+                timeout=timeout,
             ) as event_source:
-                try:
-                    for sse in event_source.iter_sse():
-                        yield SendTaskStreamingResponse(**json.loads(sse.data))
-                except json.JSONDecodeError as e:
-                    raise A2AClientJSONError(str(e)) from e
-                except httpx.RequestError as e:
-                    raise A2AClientHTTPError(400, str(e)) from e
-
-    async def _send_request(self, request: JSONRPCRequest) -> dict[str, Any]:
-        async with httpx.AsyncClient() as client:
-            try:
-                # Image generation could take time, adding timeout
-                response = await client.post(
-                    self.url, json=request.model_dump(), timeout=5000
-                )
+                response = event_source.response
+                if response.headers.get("content-type", "").startswith("application/json"):
+                    # Errors such as validation failures or a busy server come
+                    # back as a plain JSON-RPC response instead of a stream.
+                    yield SendTaskStreamingResponse.model_validate_json(
+                        await response.aread()
+                    )
+                    return
+
                 response.raise_for_status()
-                return response.json()
-            except httpx.HTTPStatusError as e:
-                raise A2AClientHTTPError(e.response.status_code, str(e)) from e
-            except json.JSONDecodeError as e:
-                raise A2AClientJSONError(str(e)) from e
+                async for sse in event_source.aiter_sse():
+                    result = SendTaskStreamingResponse.model_validate_json(sse.data)
+                    if sse.id.isdigit():
+                        result._sequence = int(sse.id)
+                    yield result
+        except ValidationError as e:
+            raise A2AClientJSONError(str(e)) from e
+        except httpx.HTTPStatusError as e:
+            raise A2AClientHTTPError(e.response.status_code, str(e)) from e
+        except (httpx.RequestError, SSEError) as e:
+            raise A2AClientHTTPError(400, str(e)) from e
+
+    async def _send_request(
+        self,
+        request: JSONRPCRequest,
+        timeout: httpx.Timeout | float | None = None,
+    ) -> dict[str, Any]:
+        client = self._get_client()
+        try:
+            response = await client.post(
+                self.url,
+                json=request.model_dump(),
+                timeout=timeout if timeout is not None else httpx.USE_CLIENT_DEFAULT,
+            )
+            response.raise_for_status()
+            return response.json()
+        except httpx.HTTPStatusError as e:
+            raise A2AClientHTTPError(e.response.status_code, str(e)) from e
+        except json.JSONDecodeError as e:
+            raise A2AClientJSONError(str(e)) from e
 
-    async def get_task(self, payload: dict[str, Any]) -> GetTaskResponse:
+    async def get_task(
+        self, payload: dict[str, Any], timeout: httpx.Timeout | float | None = None
+    ) -> GetTaskResponse:
         request = GetTaskRequest(params=payload)
-        return GetTaskResponse(**await self._send_request(request))
+        return GetTaskResponse(**await self._send_request(request, timeout))
 
-    async def cancel_task(self, payload: dict[str, Any]) -> CancelTaskResponse:
+    async def cancel_task(
+        self, payload: dict[str, Any], timeout: httpx.Timeout | float | None = None
+    ) -> CancelTaskResponse:
         request = CancelTaskRequest(params=payload)
-        return CancelTaskResponse(**await self._send_request(request))
+        return CancelTaskResponse(**await self._send_request(request, timeout))
 
     async def set_task_callback(
-        self, payload: dict[str, Any]
+        self, payload: dict[str, Any], timeout: httpx.Timeout | float | None = None
     ) -> SetTaskPushNotificationResponse:
         request = SetTaskPushNotificationRequest(params=payload)
-        return SetTaskPushNotificationResponse(**await self._send_request(request))
+        return SetTaskPushNotificationResponse(
+            **await self._send_request(request, timeout)
+        )
 
     async def get_task_callback(
-        self, payload: dict[str, Any]
+        self, payload: dict[str, Any], timeout: httpx.Timeout | float | None = None
     ) -> GetTaskPushNotificationResponse:
         request = GetTaskPushNotificationRequest(params=payload)
-        return GetTaskPushNotificationResponse(**await self._send_request(request))
+        return GetTaskPushNotificationResponse(
+            **await self._send_request(request, timeout)
+        )
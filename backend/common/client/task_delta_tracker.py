@@ -0,0 +1,75 @@
+from collections import OrderedDict
+from typing import Any
+from common.client.client import A2AClient
+from common.types import A2AClientError, Task, TaskDelta
+
+# tasks/get returns no history unless asked; this asks for all of it.
+FULL_HISTORY_LENGTH = 2**31 - 1
+
+
+class TaskDeltaTracker:
+    """Rebuilds tasks from the push-notifications a receiver gets.
+
+    Full task payloads replace the tracked task. TaskDelta payloads are
+    applied when they build on the tracked version; otherwise a notification
+    was missed and the task must be fetched again, which receive() does
+    through the agent's tasks/get.
+    """
+
+    def __init__(self, client: A2AClient | None = None, max_tasks: int = 1000):
+        self.client = client
+        self.max_tasks = max_tasks
+        self.tasks: OrderedDict[str, Task] = OrderedDict()
+        self.applied = 0
+        self.gaps = 0
+
+    def apply(self, data: dict[str, Any]) -> Task | None:
+        """Applies one notification, returning None when a gap was detected."""
+        if "baseVersion" not in data:
+            return self._remember(Task.model_validate(data))
+
+        delta = TaskDelta.model_validate(data)
+        current = self.tasks.get(delta.id)
+        if delta.baseVersion == 0:
+            history, artifacts = [], []
+        elif current is not None and current.version == delta.baseVersion:
+            history, artifacts = current.history or [], current.artifacts or []
+        elif current is not None and current.version is not None and current.version >= delta.version:
+            # Already seen, e.g. the task was fetched after this was sent.
+            return current
+        else:
+            self.gaps += 1
+            return None
+
+        self.applied += 1
+        return self._remember(Task(
+            id=delta.id,
+            sessionId=delta.sessionId,
+            status=delta.status,
+            history=history + delta.history,
+            artifacts=artifacts + delta.artifacts,
+            metadata=delta.metadata,
+            version=delta.version,
+        ))
+
+    async def receive(self, data: dict[str, Any]) -> Task:
+        """Applies one notification, fetching the full task on a gap."""
+        task = self.apply(data)
+        if task is not None:
+            return task
+        if self.client is None:
+            raise A2AClientError(f"Missed an update of task {data['id']} and cannot fetch it")
+
+        response = await self.client.get_task(
+            {"id": data["id"], "historyLength": FULL_HISTORY_LENGTH}
+        )
+        if response.error is not None:
+            raise A2AClientError(f"Could not fetch task {data['id']}: {response.error.message}")
+        return self._remember(response.result)
+
+    def _remember(self, task: Task) -> Task:
+        self.tasks[task.id] = task
+        self.tasks.move_to_end(task.id)
+        while len(self.tasks) > self.max_tasks:
+            self.tasks.popitem(last=False)
+        return task
@@ -1,4 +1,23 @@
 from .server import A2AServer
 from .task_manager import TaskManager, InMemoryTaskManager
+from .task_store import TaskStore, InMemoryTaskStore, SqliteTaskStore
+from .task_retention import TaskRetentionPolicy
+from .sse_subscriber import SlowConsumerPolicy
+from .agent_invoker import AgentInvoker, AgentInvokerBusyError
+from .admission import AdmissionController
+from .push_delivery import PushNotificationDispatcher
 
-__all__ = ["A2AServer", "TaskManager", "InMemoryTaskManager"]
+__all__ = [
+    "A2AServer",
+    "TaskManager",
+    "InMemoryTaskManager",
+    "TaskStore",
+    "InMemoryTaskStore",
+    "SqliteTaskStore",
+    "TaskRetentionPolicy",
+    "SlowConsumerPolicy",
+    "AgentInvoker",
+    "AgentInvokerBusyError",
+    "AdmissionController",
+    "PushNotificationDispatcher",
+]
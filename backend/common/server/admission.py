@@ -0,0 +1,115 @@
+from typing import Any
+import asyncio
+import time
+
+
+class AdmissionController:
+    """Limits concurrent task executions per server and per session.
+
+    Requests beyond the limits wait in a bounded queue. When the queue is
+    full, or a request waits longer than queue_timeout, acquire() returns
+    False and the caller should reject the request with a retry hint.
+    """
+
+    def __init__(
+        self,
+        max_concurrent: int = 32,
+        max_concurrent_per_session: int = 4,
+        max_queue: int = 64,
+        queue_timeout: float = 10.0,
+        retry_after: float = 1.0,
+    ):
+        self.max_concurrent = max_concurrent
+        self.max_concurrent_per_session = max_concurrent_per_session
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.retry_after = retry_after
+        self._slots = asyncio.Semaphore(max_concurrent)
+        # session id -> [semaphore, number of requests holding or waiting on it]
+        self._session_slots: dict[str, list] = {}
+        self.in_flight = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    async def acquire(self, session_id: str | None) -> bool:
+        session_slot = self._session_slots.get(session_id)
+        slots_free = (
+            (session_slot is None or not session_slot[0].locked())
+            and not self._slots.locked()
+        )
+        if not slots_free and self.waiting >= self.max_queue:
+            # The queue bound only applies to requests that would wait.
+            self.rejected += 1
+            return False
+
+        if session_slot is None:
+            session_slot = self._session_slots[session_id] = [
+                asyncio.Semaphore(self.max_concurrent_per_session),
+                0,
+            ]
+        session_slot[1] += 1
+
+        started = time.monotonic()
+        if slots_free:
+            # Both slots are free, so neither acquire suspends.
+            await self._acquire_both(session_slot[0])
+        else:
+            self.waiting += 1
+            try:
+                await asyncio.wait_for(
+                    self._acquire_both(session_slot[0]), self.queue_timeout
+                )
+            except asyncio.TimeoutError:
+                self.rejected += 1
+                self._release_session(session_id)
+                return False
+            except BaseException:
+                self._release_session(session_id)
+                raise
+            finally:
+                self.waiting -= 1
+
+        waited = time.monotonic() - started
+        self.total_wait += waited
+        self.max_wait = max(self.max_wait, waited)
+        self.admitted += 1
+        self.in_flight += 1
+        return True
+
+    def release(self, session_id: str | None):
+        self.in_flight -= 1
+        self._slots.release()
+        session_slot = self._session_slots.get(session_id)
+        if session_slot is not None:
+            session_slot[0].release()
+        self._release_session(session_id)
+
+    async def _acquire_both(self, session_semaphore: asyncio.Semaphore):
+        await session_semaphore.acquire()
+        try:
+            await self._slots.acquire()
+        except BaseException:
+            session_semaphore.release()
+            raise
+
+    def _release_session(self, session_id: str | None):
+        session_slot = self._session_slots.get(session_id)
+        if session_slot is None:
+            return
+        session_slot[1] -= 1
+        if session_slot[1] == 0:
+            del self._session_slots[session_id]
+
+    def get_stats(self) -> dict[str, Any]:
+        return {
+            "max_concurrent": self.max_concurrent,
+            "in_flight": self.in_flight,
+            "queue_depth": self.waiting,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "avg_wait": self.total_wait / self.admitted if self.admitted else 0.0,
+            "max_wait": self.max_wait,
+        }
@@ -0,0 +1,129 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+import asyncio
+import inspect
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class AgentInvokerBusyError(Exception):
+    """Raised when the invoker's wait queue is full."""
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class AgentInvoker:
+    """Runs agent calls without blocking the event loop.
+
+    Coroutine functions are awaited directly. Synchronous functions run on a
+    bounded thread pool; at most max_workers run at once and at most
+    max_queue more may wait for a worker, beyond that calls are rejected
+    with AgentInvokerBusyError. A call counts against these limits until its
+    thread is done, even if the caller was cancelled meanwhile. Time spent
+    waiting for a worker is reported separately from execution time.
+    """
+
+    def __init__(self, max_workers: int = 4, max_queue: int = 32):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="agent-invoker"
+        )
+        # Counters and timings are updated from worker threads too.
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._running = 0
+        self.calls = 0
+        self.rejected = 0
+        self.total_queue_wait = 0.0
+        self.max_queue_wait = 0.0
+        self.total_execution = 0.0
+        self.max_execution = 0.0
+
+    async def invoke(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        if inspect.iscoroutinefunction(fn):
+            started = time.perf_counter()
+            try:
+                return await fn(*args, **kwargs)
+            finally:
+                with self._lock:
+                    self._record(0.0, time.perf_counter() - started)
+
+        with self._lock:
+            if self._pending >= self.max_workers + self.max_queue:
+                self.rejected += 1
+                raise AgentInvokerBusyError(
+                    f"Agent invoker is busy ({self._pending} calls pending)",
+                    self.retry_after,
+                )
+            self._pending += 1
+
+        submitted = time.perf_counter()
+        timings = {}
+
+        def run():
+            with self._lock:
+                self._running += 1
+            timings["started"] = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                timings["finished"] = time.perf_counter()
+                with self._lock:
+                    self._running -= 1
+
+        def done(_):
+            # Runs once the call finished, or was dropped before it started.
+            with self._lock:
+                self._pending -= 1
+                if "finished" in timings:
+                    self._record(
+                        timings["started"] - submitted,
+                        timings["finished"] - timings["started"],
+                    )
+
+        future = self._executor.submit(run)
+        future.add_done_callback(done)
+        # If the caller is cancelled, a call that has not started yet is
+        # dropped; a running one finishes on its thread and is discarded.
+        return await asyncio.wrap_future(future)
+
+    @property
+    def retry_after(self) -> float:
+        """Rough seconds until a worker frees up, for busy responses."""
+        if not self.calls:
+            return 1.0
+        average = self.total_execution / self.calls
+        return max(1.0, average * self._pending / self.max_workers)
+
+    def _record(self, queue_wait: float, execution: float):
+        self.calls += 1
+        self.total_queue_wait += queue_wait
+        self.max_queue_wait = max(self.max_queue_wait, queue_wait)
+        self.total_execution += execution
+        self.max_execution = max(self.max_execution, execution)
+        logger.debug(
+            f"Agent call waited {queue_wait * 1000:.1f}ms, ran {execution * 1000:.1f}ms"
+        )
+
+    def get_stats(self) -> dict[str, Any]:
+        return {
+            "max_workers": self.max_workers,
+            "max_queue": self.max_queue,
+            "pending": self._pending,
+            "running": self._running,
+            "calls": self.calls,
+            "rejected": self.rejected,
+            "avg_queue_wait": self.total_queue_wait / self.calls if self.calls else 0.0,
+            "max_queue_wait": self.max_queue_wait,
+            "avg_execution": self.total_execution / self.calls if self.calls else 0.0,
+            "max_execution": self.max_execution,
+        }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
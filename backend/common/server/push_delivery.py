@@ -0,0 +1,229 @@
+from collections import OrderedDict, deque
+from typing import Any
+from common.types import TaskState
+from common.utils.push_notification_auth import PushNotificationSenderAuth
+from common.server.task_retention import TERMINAL_TASK_STATES
+import asyncio
+import httpx
+import json
+import logging
+import random
+import time
+
+logger = logging.getLogger(__name__)
+
+# States that end a turn of a task; their notifications are never coalesced.
+FINAL_NOTIFICATION_STATES = (*TERMINAL_TASK_STATES, TaskState.INPUT_REQUIRED)
+# Client errors that may succeed on a later attempt; other 4xx are final.
+RETRYABLE_CLIENT_ERRORS = {408, 425, 429}
+
+
+def merge_task_deltas(older: dict[str, Any], newer: dict[str, Any]) -> dict[str, Any]:
+    """Folds two consecutive TaskDelta payloads into one covering both."""
+    if newer.get("baseVersion") != older.get("version"):
+        # The newer delta does not build on the older one, e.g. it restarts
+        # from the full task; it already says everything.
+        return newer
+    merged = dict(newer)
+    merged["baseVersion"] = older["baseVersion"]
+    merged["history"] = older.get("history", []) + newer.get("history", [])
+    merged["artifacts"] = older.get("artifacts", []) + newer.get("artifacts", [])
+    return merged
+
+
+class PushNotification:
+    def __init__(self, url: str, task_id: str, data: dict[str, Any], final: bool):
+        self.url = url
+        self.task_id = task_id
+        self.data = data
+        self.final = final
+        self.enqueued_at = time.monotonic()
+        self.attempts = 0
+
+
+class PushNotificationDispatcher:
+    """Delivers push notifications in the background.
+
+    enqueue() never waits on the network. Notifications are queued per
+    destination URL and delivered in order by a pool of workers sharing one
+    pooled HTTP client; a destination is served by one worker at a time.
+    While a notification for a task is still queued, a newer non-final
+    update for the same task replaces it, so bursts of status updates
+    collapse into one POST. Final notifications are never replaced. Queued
+    TaskDelta payloads are merged rather than replaced, so no change is lost.
+
+    Failed deliveries are retried with jittered exponential backoff. After
+    max_attempts, or on a non-retryable response, the notification goes to
+    a bounded dead-letter list and, if dead_letter_path is set, is appended
+    to that file as a JSON line.
+    """
+
+    def __init__(
+        self,
+        sender_auth: PushNotificationSenderAuth,
+        max_workers: int = 4,
+        max_attempts: int = 5,
+        backoff: float = 0.5,
+        max_backoff: float = 30.0,
+        timeout: float = 10.0,
+        dead_letter_path: str | None = None,
+        max_dead_letters: int = 1000,
+        drain_timeout: float = 5.0,
+    ):
+        self.sender_auth = sender_auth
+        self.max_workers = max_workers
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.timeout = timeout
+        self.dead_letter_path = dead_letter_path
+        self.dead_letters: deque[dict[str, Any]] = deque(maxlen=max_dead_letters)
+        self.drain_timeout = drain_timeout
+        # url -> pending notifications; each is keyed by task id while it
+        # can still be coalesced, or by a unique key once it cannot.
+        self._pending: dict[str, OrderedDict[Any, PushNotification]] = {}
+        self._busy: set[str] = set()
+        self._ready: asyncio.Queue | None = None
+        self._workers: list[asyncio.Task] = []
+        self._client: httpx.AsyncClient | None = None
+        self.enqueued = 0
+        self.coalesced = 0
+        self.delivered = 0
+        self.retried = 0
+        self.failed = 0
+        self.total_latency = 0.0
+
+    def enqueue(self, url: str, task_id: str, data: dict[str, Any], final: bool = False):
+        self._start()
+        notification = PushNotification(url, task_id, data, final)
+        self.enqueued += 1
+
+        pending = self._pending.setdefault(url, OrderedDict())
+        queued = pending.get(task_id)
+        if queued is not None:
+            # Replace the queued update in place so per-task order holds.
+            self.coalesced += 1
+            notification.enqueued_at = queued.enqueued_at
+            if "baseVersion" in data and "baseVersion" in queued.data:
+                notification.data = merge_task_deltas(queued.data, data)
+        pending[task_id] = notification
+        if final:
+            # Later updates for the task must queue behind this one.
+            pending[(task_id, id(notification))] = pending.pop(task_id)
+
+        if url not in self._busy:
+            self._busy.add(url)
+            self._ready.put_nowait(url)
+
+    async def close(self):
+        if not self._workers:
+            return
+
+        try:
+            await asyncio.wait_for(self._drain(), self.drain_timeout)
+        except asyncio.TimeoutError:
+            logger.warning(
+                f"Dropping {sum(len(p) for p in self._pending.values())} undelivered push notifications"
+            )
+
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        await self._client.aclose()
+        self._client = None
+
+    def _start(self):
+        if self._workers:
+            return
+        self._ready = asyncio.Queue()
+        self._client = httpx.AsyncClient(
+            timeout=self.timeout,
+            limits=httpx.Limits(max_connections=self.max_workers * 2),
+        )
+        self._workers = [
+            asyncio.create_task(self._run_worker()) for _ in range(self.max_workers)
+        ]
+
+    async def _drain(self):
+        while self._busy:
+            await asyncio.sleep(0.05)
+
+    async def _run_worker(self):
+        while True:
+            url = await self._ready.get()
+            pending = self._pending.get(url)
+            while pending:
+                _, notification = pending.popitem(last=False)
+                await self._deliver(notification)
+            self._pending.pop(url, None)
+            self._busy.discard(url)
+
+    async def _deliver(self, notification: PushNotification):
+        while True:
+            notification.attempts += 1
+            try:
+                await self.sender_auth.deliver_push_notification(
+                    self._client, notification.url, notification.data
+                )
+            except Exception as e:
+                retryable = not isinstance(e, httpx.HTTPStatusError) or (
+                    e.response.status_code >= 500
+                    or e.response.status_code in RETRYABLE_CLIENT_ERRORS
+                )
+                if not retryable or notification.attempts >= self.max_attempts:
+                    await self._dead_letter(notification, e)
+                    return
+
+                self.retried += 1
+                delay = random.uniform(
+                    0, min(self.max_backoff, self.backoff * 2 ** (notification.attempts - 1))
+                )
+                logger.info(
+                    f"Retrying push notification to {notification.url} in {delay:.2f}s: {e}"
+                )
+                await asyncio.sleep(delay)
+                continue
+
+            self.delivered += 1
+            self.total_latency += time.monotonic() - notification.enqueued_at
+            return
+
+    async def _dead_letter(self, notification: PushNotification, error: Exception):
+        self.failed += 1
+        logger.warning(
+            f"Giving up on push notification for task {notification.task_id} to "
+            f"{notification.url} after {notification.attempts} attempts: {error}"
+        )
+        entry = {
+            "url": notification.url,
+            "task_id": notification.task_id,
+            "final": notification.final,
+            "attempts": notification.attempts,
+            "error": str(error),
+            "failed_at": time.time(),
+            "data": notification.data,
+        }
+        self.dead_letters.append(entry)
+        if self.dead_letter_path:
+            try:
+                await asyncio.to_thread(self._append_dead_letter, entry)
+            except OSError as e:
+                logger.error(f"Could not write push dead letter to {self.dead_letter_path}: {e}")
+
+    def _append_dead_letter(self, entry: dict[str, Any]):
+        with open(self.dead_letter_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry, default=str) + "\n")
+
+    def get_stats(self) -> dict[str, Any]:
+        return {
+            "destinations": len(self._pending),
+            "queued": sum(len(pending) for pending in self._pending.values()),
+            "enqueued": self.enqueued,
+            "coalesced": self.coalesced,
+            "delivered": self.delivered,
+            "retried": self.retried,
+            "failed": self.failed,
+            "dead_letters": len(self.dead_letters),
+            "avg_latency": self.total_latency / self.delivered if self.delivered else 0.0,
+        }
@@ -1,5 +1,5 @@
 from starlette.applications import Starlette
-from starlette.responses import JSONResponse
+from starlette.responses import JSONResponse, Response
 from sse_starlette.sse import EventSourceResponse
 from starlette.requests import Request
 from common.types import (
@@ -16,11 +16,15 @@ from common.types import (
     AgentCard,
     TaskResubscriptionRequest,
     SendTaskStreamingRequest,
+    ServerBusyError,
 )
 from pydantic import ValidationError
+import contextlib
+import hashlib
 import json
 from typing import AsyncIterable, Any
 from common.server.task_manager import TaskManager
+from common.server.admission import AdmissionController
 
 import logging
 
@@ -35,17 +39,21 @@ class A2AServer:
         endpoint="/",
         agent_card: AgentCard = None,
         task_manager: TaskManager = None,
+        admission_controller: AdmissionController = None,
     ):
         self.host = host
         self.port = port
         self.endpoint = endpoint
         self.task_manager = task_manager
         self.agent_card = agent_card
-        self.app = Starlette()
+        self._agent_card_cache: tuple[AgentCard, bytes, str] | None = None
+        self.admission_controller = admission_controller or AdmissionController()
+        self.app = Starlette(lifespan=self._lifespan)
         self.app.add_route(self.endpoint, self._process_request, methods=["POST"])
         self.app.add_route(
             "/.well-known/agent.json", self._get_agent_card, methods=["GET"]
         )
+        self.app.add_route("/metrics", self._get_metrics, methods=["GET"])
 
     def start(self):
         if self.agent_card is None:
@@ -58,8 +66,34 @@ class A2AServer:
 
         uvicorn.run(self.app, host=self.host, port=self.port)
 
-    def _get_agent_card(self, request: Request) -> JSONResponse:
-        return JSONResponse(self.agent_card.model_dump(exclude_none=True))
+    @contextlib.asynccontextmanager
+    async def _lifespan(self, app: Starlette):
+        await self.task_manager.startup()
+        try:
+            yield
+        finally:
+            await self.task_manager.shutdown()
+
+    def _get_agent_card(self, request: Request) -> Response:
+        # Render the card once and let clients revalidate with If-None-Match.
+        if self._agent_card_cache is None or self._agent_card_cache[0] is not self.agent_card:
+            body = self.agent_card.model_dump_json(exclude_none=True).encode()
+            etag = f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+            self._agent_card_cache = (self.agent_card, body, etag)
+
+        _, body, etag = self._agent_card_cache
+        headers = {"ETag": etag}
+        if request.headers.get("if-none-match") == etag:
+            return Response(status_code=304, headers=headers)
+        return Response(body, media_type="application/json", headers=headers)
+
+    def _get_metrics(self, request: Request) -> JSONResponse:
+        return JSONResponse(
+            {
+                "admission": self.admission_controller.get_stats(),
+                "task_manager": self.task_manager.get_stats(),
+            }
+        )
 
     async def _process_request(self, request: Request):
         try:
@@ -69,11 +103,23 @@ class A2AServer:
             if isinstance(json_rpc_request, GetTaskRequest):
                 result = await self.task_manager.on_get_task(json_rpc_request)
             elif isinstance(json_rpc_request, SendTaskRequest):
-                result = await self.task_manager.on_send_task(json_rpc_request)
+                session_id = json_rpc_request.params.sessionId
+                if not await self.admission_controller.acquire(session_id):
+                    return self._create_busy_response(json_rpc_request.id)
+                try:
+                    result = await self.task_manager.on_send_task(json_rpc_request)
+                finally:
+                    self._release_when_run_ends(json_rpc_request.params.id, session_id)
             elif isinstance(json_rpc_request, SendTaskStreamingRequest):
-                result = await self.task_manager.on_send_task_subscribe(
-                    json_rpc_request
-                )
+                session_id = json_rpc_request.params.sessionId
+                if not await self.admission_controller.acquire(session_id):
+                    return self._create_busy_response(json_rpc_request.id)
+                try:
+                    result = await self.task_manager.on_send_task_subscribe(
+                        json_rpc_request
+                    )
+                finally:
+                    self._release_when_run_ends(json_rpc_request.params.id, session_id)
             elif isinstance(json_rpc_request, CancelTaskRequest):
                 result = await self.task_manager.on_cancel_task(json_rpc_request)
             elif isinstance(json_rpc_request, SetTaskPushNotificationRequest):
@@ -81,6 +127,13 @@ class A2AServer:
             elif isinstance(json_rpc_request, GetTaskPushNotificationRequest):
                 result = await self.task_manager.on_get_task_push_notification(json_rpc_request)
             elif isinstance(json_rpc_request, TaskResubscriptionRequest):
+                last_event_id = request.headers.get("last-event-id")
+                if (
+                    json_rpc_request.params.fromSequence is None
+                    and last_event_id
+                    and last_event_id.isdigit()
+                ):
+                    json_rpc_request.params.fromSequence = int(last_event_id) + 1
                 result = await self.task_manager.on_resubscribe_to_task(
                     json_rpc_request
                 )
@@ -93,6 +146,25 @@ class A2AServer:
         except Exception as e:
             return self._handle_exception(e)
 
+    def _release_when_run_ends(self, task_id: str, session_id: str):
+        # The slot is held while the agent works, even if the client has
+        # already left, so disconnects cannot push more runs past the limit.
+        run = self.task_manager.get_agent_run(task_id)
+        if run is None or run.done():
+            self.admission_controller.release(session_id)
+        else:
+            run.add_done_callback(lambda _: self.admission_controller.release(session_id))
+
+    def _create_busy_response(self, request_id) -> JSONResponse:
+        retry_after = self.admission_controller.retry_after
+        response = JSONRPCResponse(
+            id=request_id, error=ServerBusyError(data={"retryAfter": retry_after})
+        )
+        return JSONResponse(
+            response.model_dump(exclude_none=True),
+            headers={"Retry-After": str(max(int(retry_after), 1))},
+        )
+
     def _handle_exception(self, e: Exception) -> JSONResponse:
         if isinstance(e, json.decoder.JSONDecodeError):
             json_rpc_error = JSONParseError()
@@ -110,7 +182,11 @@ class A2AServer:
 
             async def event_generator(result) -> AsyncIterable[dict[str, str]]:
                 async for item in result:
-                    yield {"data": item.model_dump_json(exclude_none=True)}
+                    event = {"data": item.model_dump_json(exclude_none=True)}
+                    sequence = getattr(item, "_sequence", None)
+                    if sequence is not None:
+                        event["id"] = str(sequence)
+                    yield event
 
             return EventSourceResponse(event_generator(result))
         elif isinstance(result, JSONRPCResponse):
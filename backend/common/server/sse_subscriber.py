@@ -0,0 +1,113 @@
+from collections import deque
+from enum import Enum
+from typing import Any
+from common.types import TaskStatusUpdateEvent, InternalError
+import asyncio
+import time
+
+
+class SlowConsumerPolicy(str, Enum):
+    DROP_OLDEST = "drop-oldest"
+    COALESCE = "coalesce"
+    DISCONNECT = "disconnect"
+
+
+class SseSubscriber:
+    """Bounded event queue for one SSE consumer.
+
+    offer() never blocks, so a stalled client cannot hold up delivery to the
+    other subscribers of a task. When the queue is full the policy decides
+    what happens:
+
+    - drop-oldest: discard the oldest queued event.
+    - coalesce: discard queued non-final status updates, keeping only the
+      newest. Artifact updates and final events are never dropped and may
+      exceed the bound.
+    - disconnect: close the subscriber; the consumer receives an error.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 64,
+        policy: SlowConsumerPolicy = SlowConsumerPolicy.COALESCE,
+    ):
+        self.maxsize = maxsize
+        self.policy = policy
+        self.closed = False
+        self._events: deque[tuple[float, int | None, Any]] = deque()
+        self._ready = asyncio.Event()
+        self.enqueued = 0
+        self.delivered = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self.max_depth = 0
+
+    def offer(self, event: Any, sequence: int | None = None) -> bool:
+        """Queues an event. Returns False once the subscriber is closed."""
+        if self.closed:
+            return False
+
+        if len(self._events) >= self.maxsize and not self._make_room(event):
+            return False
+
+        self._append(sequence, event)
+        return True
+
+    def preload(self, events: list[tuple[int, Any]]):
+        """Queues replayed events without applying the size bound."""
+        for sequence, event in events:
+            self._append(sequence, event)
+
+    async def get(self) -> tuple[int | None, Any]:
+        while not self._events:
+            if self.closed:
+                return None, InternalError(message="Subscriber disconnected for being too slow")
+            self._ready.clear()
+            await self._ready.wait()
+
+        _, sequence, event = self._events.popleft()
+        self.delivered += 1
+        return sequence, event
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "policy": self.policy.value,
+            "depth": len(self._events),
+            "max_depth": self.max_depth,
+            "lag_seconds": time.monotonic() - self._events[0][0] if self._events else 0.0,
+            "enqueued": self.enqueued,
+            "delivered": self.delivered,
+            "dropped": self.dropped,
+            "coalesced": self.coalesced,
+            "closed": self.closed,
+        }
+
+    def _append(self, sequence: int | None, event: Any):
+        self._events.append((time.monotonic(), sequence, event))
+        self.enqueued += 1
+        self.max_depth = max(self.max_depth, len(self._events))
+        self._ready.set()
+
+    def _make_room(self, event: Any) -> bool:
+        if self.policy == SlowConsumerPolicy.DROP_OLDEST:
+            self._events.popleft()
+            self.dropped += 1
+            return True
+
+        if self.policy == SlowConsumerPolicy.COALESCE:
+            if not self._is_coalescable(event):
+                return True
+
+            kept = deque(item for item in self._events if not self._is_coalescable(item[2]))
+            self.coalesced += len(self._events) - len(kept)
+            self._events = kept
+            return True
+
+        self.closed = True
+        self._events.clear()
+        self._ready.set()
+        return False
+
+    @staticmethod
+    def _is_coalescable(event: Any) -> bool:
+        return isinstance(event, TaskStatusUpdateEvent) and not event.final
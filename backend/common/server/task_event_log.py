@@ -0,0 +1,39 @@
+from collections import deque
+from typing import Any
+
+
+class TaskEventLog:
+    """Sequence-numbered log of the streaming events emitted for one task.
+
+    Sequence numbers start at 1 and keep increasing across the turns of a
+    task (e.g. a follow-up after input-required), so they are never reused.
+    turn_start is the first sequence of the current turn. Only the newest
+    max_events entries are kept; a reader asking for older events gets the
+    oldest retained ones and can detect the gap from the sequence numbers.
+    finished_at is set when a turn's final event is logged and cleared when
+    the next turn starts.
+    """
+
+    def __init__(self, max_events: int = 256):
+        self._events: deque[tuple[int, Any]] = deque(maxlen=max_events)
+        self.last_sequence = 0
+        self.turn_start = 1
+        self.finished_at: float | None = None
+
+    def start_turn(self):
+        self.turn_start = self.last_sequence + 1
+        self.finished_at = None
+
+    def append(self, event: Any) -> int:
+        self.last_sequence += 1
+        self._events.append((self.last_sequence, event))
+        return self.last_sequence
+
+    def since(self, from_sequence: int) -> list[tuple[int, Any]]:
+        """Returns the retained events with a sequence >= from_sequence."""
+        if from_sequence > self.last_sequence:
+            return []
+
+        first_sequence = self.last_sequence - len(self._events) + 1
+        skip = max(from_sequence - first_sequence, 0)
+        return [self._events[i] for i in range(skip, len(self._events))]
@@ -1,5 +1,6 @@
 from abc import ABC, abstractmethod
-from typing import Union, AsyncIterable, List
+from collections import OrderedDict
+from typing import Any, Union, AsyncIterable, List
 from common.types import Task
 from common.types import (
     JSONRPCResponse,
@@ -30,10 +31,25 @@ from common.types import (
     JSONRPCError,
     TaskPushNotificationConfig,
     InternalError,
+    TaskNotModifiedError,
+    TaskDelta,
+)
+from common.server.task_snapshot import TaskSnapshot
+from common.server.sse_subscriber import SseSubscriber, SlowConsumerPolicy
+from common.server.task_event_log import TaskEventLog
+from common.server.agent_invoker import AgentInvoker
+from common.server.push_delivery import PushNotificationDispatcher
+from common.server.task_store import TaskStore, InMemoryTaskStore
+from common.server.task_retention import (
+    TERMINAL_TASK_STATES,
+    TaskRetentionPolicy,
+    TaskRetentionTracker,
+    append_to_archive,
 )
 from common.server.utils import new_not_implemented_error
 import asyncio
 import logging
+import time
 
 logger = logging.getLogger(__name__)
 
@@ -74,40 +90,289 @@ class TaskManager(ABC):
     ) -> Union[AsyncIterable[SendTaskResponse], JSONRPCResponse]:
         pass
 
+    async def startup(self):
+        pass
+
+    async def shutdown(self):
+        pass
+
+    def get_agent_run(self, task_id: str) -> asyncio.Task | None:
+        """Returns the in-flight agent work of a task, if the manager tracks it."""
+        return None
+
+    def get_stats(self) -> dict[str, Any]:
+        return {}
+
 
 class InMemoryTaskManager(TaskManager):
-    def __init__(self):
-        self.tasks: dict[str, Task] = {}
-        self.push_notification_infos: dict[str, PushNotificationConfig] = {}
-        self.lock = asyncio.Lock()
-        self.task_sse_subscribers: dict[str, List[asyncio.Queue]] = {}
+    def __init__(
+        self,
+        task_store: TaskStore | None = None,
+        retention_policy: TaskRetentionPolicy | None = None,
+        sse_queue_size: int = 64,
+        sse_slow_consumer_policy: SlowConsumerPolicy = SlowConsumerPolicy.COALESCE,
+        event_log_size: int = 256,
+        event_log_ttl: float = 300.0,
+        max_finished_event_logs: int = 1000,
+        cancel_on_disconnect: bool = False,
+        agent_invoker: AgentInvoker | None = None,
+        push_dispatcher: PushNotificationDispatcher | None = None,
+        lock_stripes: int = 256,
+    ):
+        self.task_store = task_store or InMemoryTaskStore()
+        self.retention = TaskRetentionTracker(retention_policy or TaskRetentionPolicy())
+        self._retention_sweeper: asyncio.Task | None = None
+        # Writers of a task are serialized by one of a fixed set of locks
+        # picked by its id; stored tasks are never mutated in place, so
+        # readers can use whatever snapshot the store returns.
+        self.task_locks = [asyncio.Lock() for _ in range(lock_stripes)]
+        self.task_sse_subscribers: dict[str, List[SseSubscriber]] = {}
         self.subscriber_lock = asyncio.Lock()
+        self.sse_queue_size = sse_queue_size
+        self.sse_slow_consumer_policy = sse_slow_consumer_policy
+        self.task_event_logs: dict[str, TaskEventLog] = {}
+        self.event_log_size = event_log_size
+        # Logs whose turn has ended, oldest first. They are kept for
+        # event_log_ttl seconds so late resubscribers can still replay
+        # them, and at most max_finished_event_logs of them are retained.
+        self.finished_event_logs: OrderedDict[str, float] = OrderedDict()
+        self.event_log_ttl = event_log_ttl
+        self.max_finished_event_logs = max_finished_event_logs
+        self.running_agents: dict[str, asyncio.Task] = {}
+        self.cancellations: dict[str, asyncio.Task] = {}
+        self.cancel_on_disconnect = cancel_on_disconnect
+        self.agent_invoker = agent_invoker or AgentInvoker()
+        self.push_dispatcher = push_dispatcher
+        # task id -> (version, history length, artifacts length) of the last
+        # delta push-notification built for the task.
+        self.push_delta_bases: dict[str, tuple[int, int, int]] = {}
 
     async def on_get_task(self, request: GetTaskRequest) -> GetTaskResponse:
         logger.info(f"Getting task {request.params.id}")
         task_query_params: TaskQueryParams = request.params
 
-        async with self.lock:
-            task = self.tasks.get(task_query_params.id)
-            if task is None:
-                return GetTaskResponse(id=request.id, error=TaskNotFoundError())
+        task = await self.task_store.get_task(task_query_params.id)
+        if task is None:
+            return GetTaskResponse(id=request.id, error=TaskNotFoundError())
 
-            task_result = self.append_task_history(
-                task, task_query_params.historyLength
+        self.retention.touch(task.id)
+        if task_query_params.ifVersion == task.version:
+            return GetTaskResponse(
+                id=request.id, error=TaskNotModifiedError(data={"version": task.version})
             )
 
+        task_result = self.append_task_history(
+            task, task_query_params.historyLength
+        )
+
         return GetTaskResponse(id=request.id, result=task_result)
 
     async def on_cancel_task(self, request: CancelTaskRequest) -> CancelTaskResponse:
         logger.info(f"Cancelling task {request.params.id}")
         task_id_params: TaskIdParams = request.params
 
-        async with self.lock:
-            task = self.tasks.get(task_id_params.id)
+        task = await self.task_store.get_task(task_id_params.id)
+        if task is None:
+            return CancelTaskResponse(id=request.id, error=TaskNotFoundError())
+
+        task = await self.cancel_task(task_id_params.id)
+        if task is None:
+            return CancelTaskResponse(id=request.id, error=TaskNotCancelableError())
+
+        return CancelTaskResponse(id=request.id, result=self.append_task_history(task, 0))
+
+    def track_agent_run(self, task_id: str, coro) -> asyncio.Task:
+        """Runs agent work for a task as an asyncio task that tasks/cancel can cancel."""
+        run = asyncio.create_task(coro)
+        self.running_agents[task_id] = run
+
+        def forget(_):
+            if self.running_agents.get(task_id) is run:
+                del self.running_agents[task_id]
+
+        run.add_done_callback(forget)
+        return run
+
+    def get_agent_run(self, task_id: str) -> asyncio.Task | None:
+        return self.running_agents.get(task_id)
+
+    async def cancel_task(self, task_id: str) -> TaskSnapshot | None:
+        """Cancels in-flight agent work and moves the task to CANCELED.
+
+        Returns None if the task is unknown or already in a terminal state.
+        Concurrent cancels of one task share a single cancellation.
+        """
+        task = await self.task_store.get_task(task_id)
+        if task is None or task.status.state in TERMINAL_TASK_STATES:
+            return None
+        return await asyncio.shield(self.start_cancellation(task_id))
+
+    def start_cancellation(self, task_id: str) -> asyncio.Task:
+        """Starts cancelling a task in the background, once per task."""
+        cancellation = self.cancellations.get(task_id)
+        if cancellation is None:
+            cancellation = asyncio.create_task(self._cancel_task(task_id))
+            self.cancellations[task_id] = cancellation
+            cancellation.add_done_callback(lambda _: self.cancellations.pop(task_id, None))
+        return cancellation
+
+    async def wait_for_cancellation(self, task_id: str):
+        """Waits until a cancellation in progress has written the final state.
+
+        Callers that saw the agent run cancelled use this before reading the
+        task, so they never return it in its pre-cancellation state.
+        """
+        cancellation = self.cancellations.get(task_id)
+        if cancellation is not None:
+            await asyncio.wait({cancellation})
+
+    async def _cancel_task(self, task_id: str) -> TaskSnapshot | None:
+        async with self.get_task_lock(task_id):
+            task = await self.task_store.get_task(task_id)
+            if task is None or task.status.state in TERMINAL_TASK_STATES:
+                # Leave a run that already finished the task to send its
+                # final events.
+                return None
+            # The run needs this lock for its next write, so it is cancelled
+            # before it can record a terminal state of its own.
+            run = self.running_agents.get(task_id)
+            if run is not None and not run.cancel():
+                # The run already finished; its caller is writing the result.
+                return None
+
+        if run is not None:
+            logger.info(f"Cancelling running agent for task {task_id}")
+            # Let the agent unwind before the final state is written.
+            await asyncio.wait({run})
+
+        async with self.get_task_lock(task_id):
+            task = await self.task_store.get_task(task_id)
             if task is None:
-                return CancelTaskResponse(id=request.id, error=TaskNotFoundError())
+                return None
+            if task.status.state in TERMINAL_TASK_STATES:
+                # The run ended the task while unwinding; make sure its
+                # subscribers still get a final event.
+                await self._ensure_final_event(task)
+                return None
+            task = await self._write_update(task, TaskStatus(state=TaskState.CANCELED), None)
+
+        await self.enqueue_events_for_sse(
+            task_id, TaskStatusUpdateEvent(id=task_id, status=task.status, final=True)
+        )
+        await self.send_task_notification(task)
+        return task
+
+    async def _ensure_final_event(self, task: TaskSnapshot):
+        async with self.subscriber_lock:
+            event_log = self.task_event_logs.get(task.id)
+            if event_log is None or event_log.finished_at is not None:
+                return
+        await self.enqueue_events_for_sse(
+            task.id, TaskStatusUpdateEvent(id=task.id, status=task.status, final=True)
+        )
+
+    async def send_task_notification(self, task: TaskSnapshot):
+        pass
+
+    def build_push_notification(
+        self, task: TaskSnapshot, notification_config: PushNotificationConfig
+    ) -> dict[str, Any]:
+        """Returns the push-notification payload for a task update.
+
+        Receivers that opted into deltas get a TaskDelta against the previous
+        notification built for the task, everyone else the full task.
+        """
+        if not notification_config.delta:
+            return task.to_task().model_dump(exclude_none=True)
+
+        base_version, history_len, artifacts_len = self.push_delta_bases.get(task.id, (0, 0, 0))
+        if base_version >= task.version:
+            # Built out of order; start the receiver over from the full task.
+            base_version, history_len, artifacts_len = 0, 0, 0
+        if task.status.state in TERMINAL_TASK_STATES:
+            self.push_delta_bases.pop(task.id, None)
+        else:
+            self.push_delta_bases[task.id] = (
+                task.version, task.history_length, task.artifacts_length
+            )
+
+        return TaskDelta.model_construct(
+            id=task.id,
+            sessionId=task.session_id,
+            version=task.version,
+            baseVersion=base_version,
+            status=task.status,
+            history=task.history_since(history_len),
+            artifacts=task.artifacts_since(artifacts_len),
+            metadata=task.metadata,
+        ).model_dump(exclude_none=True)
+
+    async def startup(self):
+        if self.retention.policy.enabled and self._retention_sweeper is None:
+            self._retention_sweeper = asyncio.create_task(self._run_retention_sweeper())
+
+    async def shutdown(self):
+        for run in list(self.running_agents.values()):
+            run.cancel()
+        self.agent_invoker.shutdown()
+        if self.push_dispatcher is not None:
+            await self.push_dispatcher.close()
+        if self._retention_sweeper is not None:
+            self._retention_sweeper.cancel()
+            self._retention_sweeper = None
+        await self.task_store.close()
+
+    def get_retention_stats(self) -> dict[str, int]:
+        return self.retention.stats()
+
+    def get_stats(self) -> dict[str, Any]:
+        stats = {
+            "retention": self.get_retention_stats(),
+            "sse_subscribers": self.get_sse_subscriber_stats(),
+            "running_agents": len(self.running_agents),
+            "agent_invoker": self.agent_invoker.get_stats(),
+        }
+        if self.push_dispatcher is not None:
+            stats["push_delivery"] = self.push_dispatcher.get_stats()
+        return stats
+
+    async def _run_retention_sweeper(self):
+        while True:
+            await asyncio.sleep(self.retention.policy.sweep_interval)
+            try:
+                await self.evict_tasks()
+            except Exception as e:
+                logger.error(f"Error while evicting tasks: {e}")
+
+    async def evict_tasks(self):
+        evicted = []
+        for task_id, reason in self.retention.select_evictions():
+            async with self.get_task_lock(task_id):
+                task = await self.task_store.get_task(task_id)
+                # The task may have been resumed since it was selected.
+                if task is not None and task_id not in self.retention.terminal_tasks:
+                    continue
+
+                await self.task_store.delete_task(task_id)
+                self.push_delta_bases.pop(task_id, None)
+                self.retention.forget(task_id)
+                self.retention.evictions[reason] += 1
+                if task is not None:
+                    evicted.append(task)
+
+            async with self.subscriber_lock:
+                self.task_sse_subscribers.pop(task_id, None)
+                self.task_event_logs.pop(task_id, None)
+                self.finished_event_logs.pop(task_id, None)
+
+        if evicted and self.retention.policy.archive_path:
+            await asyncio.to_thread(
+                append_to_archive, self.retention.policy.archive_path, evicted
+            )
+            self.retention.archived += len(evicted)
 
-        return CancelTaskResponse(id=request.id, error=TaskNotCancelableError())
+        if evicted:
+            logger.info(f"Evicted {len(evicted)} terminal tasks")
 
     @abstractmethod
     async def on_send_task(self, request: SendTaskRequest) -> SendTaskResponse:
@@ -120,29 +385,28 @@ class InMemoryTaskManager(TaskManager):
         pass
 
     async def set_push_notification_info(self, task_id: str, notification_config: PushNotificationConfig):
-        async with self.lock:
-            task = self.tasks.get(task_id)
+        async with self.get_task_lock(task_id):
+            task = await self.task_store.get_task(task_id)
             if task is None:
                 raise ValueError(f"Task not found for {task_id}")
 
-            self.push_notification_infos[task_id] = notification_config
+            await self.task_store.set_push_notification_info(task_id, notification_config)
 
         return
     
     async def get_push_notification_info(self, task_id: str) -> PushNotificationConfig:
-        async with self.lock:
-            task = self.tasks.get(task_id)
-            if task is None:
-                raise ValueError(f"Task not found for {task_id}")
+        task = await self.task_store.get_task(task_id)
+        if task is None:
+            raise ValueError(f"Task not found for {task_id}")
 
-            return self.push_notification_infos[task_id]
-            
-        return
+        notification_config = await self.task_store.get_push_notification_info(task_id)
+        if notification_config is None:
+            raise ValueError(f"Push notification info not found for {task_id}")
+
+        return notification_config
     
     async def has_push_notification_info(self, task_id: str) -> bool:
-        async with self.lock:
-            return task_id in self.push_notification_infos
-            
+        return await self.task_store.get_push_notification_info(task_id) is not None
 
     async def on_set_task_push_notification(
         self, request: SetTaskPushNotificationRequest
@@ -182,22 +446,22 @@ class InMemoryTaskManager(TaskManager):
         
         return GetTaskPushNotificationResponse(id=request.id, result=TaskPushNotificationConfig(id=task_params.id, pushNotificationConfig=notification_info))
 
-    async def upsert_task(self, task_send_params: TaskSendParams) -> Task:
+    async def upsert_task(self, task_send_params: TaskSendParams) -> TaskSnapshot:
         logger.info(f"Upserting task {task_send_params.id}")
-        async with self.lock:
-            task = self.tasks.get(task_send_params.id)
+        async with self.get_task_lock(task_send_params.id):
+            task = await self.task_store.get_task(task_send_params.id)
             if task is None:
-                task = Task(
+                task = TaskSnapshot(
                     id=task_send_params.id,
-                    sessionId = task_send_params.sessionId,
-                    messages=[task_send_params.message],
+                    session_id=task_send_params.sessionId,
                     status=TaskStatus(state=TaskState.SUBMITTED),
                     history=[task_send_params.message],
                 )
-                self.tasks[task_send_params.id] = task
             else:
-                task.history.append(task_send_params.message)
+                task = task.with_update(messages=[task_send_params.message])
 
+            await self.task_store.save_task(task)
+            self.retention.record_write(task, [task_send_params.message])
             return task
 
     async def on_resubscribe_to_task(
@@ -207,71 +471,155 @@ class InMemoryTaskManager(TaskManager):
 
     async def update_store(
         self, task_id: str, status: TaskStatus, artifacts: list[Artifact]
-    ) -> Task:
-        async with self.lock:
-            try:
-                task = self.tasks[task_id]
-            except KeyError:
+    ) -> TaskSnapshot:
+        async with self.get_task_lock(task_id):
+            task = await self.task_store.get_task(task_id)
+            if task is None:
                 logger.error(f"Task {task_id} not found for updating the task")
                 raise ValueError(f"Task {task_id} not found")
 
-            task.status = status
-
-            if status.message is not None:
-                task.history.append(status.message)
-
-            if artifacts is not None:
-                if task.artifacts is None:
-                    task.artifacts = []
-                task.artifacts.extend(artifacts)
-
-            return task
-
-    def append_task_history(self, task: Task, historyLength: int | None):
-        new_task = task.model_copy()
-        if historyLength is not None and historyLength > 0:
-            new_task.history = new_task.history[-historyLength:]
-        else:
-            new_task.history = []
-
-        return new_task        
-
-    async def setup_sse_consumer(self, task_id: str, is_resubscribe: bool = False):
+            return await self._write_update(task, status, artifacts)
+
+    async def _write_update(
+        self, task: TaskSnapshot, status: TaskStatus, artifacts: list[Artifact] | None
+    ) -> TaskSnapshot:
+        """Stores a new version of a task; the caller holds its task lock."""
+        task = task.with_update(
+            status=status,
+            messages=[status.message] if status.message is not None else (),
+            artifacts=artifacts,
+        )
+
+        await self.task_store.save_task(task)
+        self.retention.record_write(
+            task, [item for item in [status.message, *(artifacts or [])] if item is not None]
+        )
+        return task
+
+    def get_task_lock(self, task_id: str) -> asyncio.Lock:
+        return self.task_locks[hash(task_id) % len(self.task_locks)]
+
+    def append_task_history(self, task: TaskSnapshot, historyLength: int | None) -> Task:
+        return task.to_task(historyLength or 0)
+
+    async def setup_sse_consumer(
+        self,
+        task_id: str,
+        is_resubscribe: bool = False,
+        from_sequence: int | None = None,
+    ):
+        """Registers an SSE subscriber for a task.
+
+        On resubscribe, events logged from from_sequence onwards (from the
+        start of the current turn if None) are replayed before live events. Registration
+        and replay happen under subscriber_lock, the same lock events are
+        logged under, so nothing is delivered twice or missed.
+        """
         async with self.subscriber_lock:
-            if task_id not in self.task_sse_subscribers:
-                if is_resubscribe:
+            event_log = self.task_event_logs.get(task_id)
+            if is_resubscribe:
+                if event_log is None:
                     raise ValueError("Task not found for resubscription")
-                else:
-                    self.task_sse_subscribers[task_id] = []
+            elif event_log is None:
+                event_log = self.task_event_logs[task_id] = TaskEventLog(self.event_log_size)
+            else:
+                event_log.start_turn()
+                self.finished_event_logs.pop(task_id, None)
 
-            sse_event_queue = asyncio.Queue(maxsize=0) # <=0 is unlimited
-            self.task_sse_subscribers[task_id].append(sse_event_queue)
+            sse_event_queue = SseSubscriber(
+                maxsize=self.sse_queue_size, policy=self.sse_slow_consumer_policy
+            )
+            if is_resubscribe:
+                sse_event_queue.preload(
+                    event_log.since(from_sequence or event_log.turn_start)
+                )
+
+            self.task_sse_subscribers.setdefault(task_id, []).append(sse_event_queue)
             return sse_event_queue
 
     async def enqueue_events_for_sse(self, task_id, task_update_event):
         async with self.subscriber_lock:
-            if task_id not in self.task_sse_subscribers:
+            event_log = self.task_event_logs.get(task_id)
+            if event_log is None:
                 return
 
-            current_subscribers = self.task_sse_subscribers[task_id]
-            for subscriber in current_subscribers:
-                await subscriber.put(task_update_event)
+            sequence = event_log.append(task_update_event)
+            if isinstance(task_update_event, TaskStatusUpdateEvent) and task_update_event.final:
+                self._finish_event_log(task_id, event_log)
+            current_subscribers = list(self.task_sse_subscribers.get(task_id, []))
+
+        # offer() never blocks, so one slow subscriber cannot stall the others.
+        disconnected = [
+            subscriber
+            for subscriber in current_subscribers
+            if not subscriber.offer(task_update_event, sequence)
+        ]
+        if not disconnected:
+            return
+
+        logger.warning(f"Disconnecting {len(disconnected)} slow SSE subscribers for task {task_id}")
+        async with self.subscriber_lock:
+            subscribers = self.task_sse_subscribers.get(task_id, [])
+            for subscriber in disconnected:
+                if subscriber in subscribers:
+                    subscribers.remove(subscriber)
+            if not subscribers:
+                self.task_sse_subscribers.pop(task_id, None)
+
+    def _finish_event_log(self, task_id: str, event_log: TaskEventLog):
+        """Marks a log finished and drops expired ones; holds subscriber_lock."""
+        now = time.monotonic()
+        event_log.finished_at = now
+        self.finished_event_logs[task_id] = now
+        self.finished_event_logs.move_to_end(task_id)
+        while self.finished_event_logs:
+            oldest_id, finished_at = next(iter(self.finished_event_logs.items()))
+            if (
+                now - finished_at < self.event_log_ttl
+                and len(self.finished_event_logs) <= self.max_finished_event_logs
+            ):
+                break
+            del self.finished_event_logs[oldest_id]
+            self.task_event_logs.pop(oldest_id, None)
+
+    def get_sse_subscriber_stats(self) -> dict[str, list[dict]]:
+        return {
+            task_id: [subscriber.stats() for subscriber in subscribers]
+            for task_id, subscribers in self.task_sse_subscribers.items()
+            if subscribers
+        }
 
     async def dequeue_events_for_sse(
-        self, request_id, task_id, sse_event_queue: asyncio.Queue
+        self, request_id, task_id, sse_event_queue: SseSubscriber
     ) -> AsyncIterable[SendTaskStreamingResponse] | JSONRPCResponse:
+        finished = False
         try:
             while True:                
-                event = await sse_event_queue.get()
+                sequence, event = await sse_event_queue.get()
                 if isinstance(event, JSONRPCError):
-                    yield SendTaskStreamingResponse(id=request_id, error=event)
+                    response = SendTaskStreamingResponse(id=request_id, error=event)
+                    response._sequence = sequence
+                    finished = True
+                    yield response
                     break
                                                 
-                yield SendTaskStreamingResponse(id=request_id, result=event)
+                response = SendTaskStreamingResponse(id=request_id, result=event)
+                response._sequence = sequence
                 if isinstance(event, TaskStatusUpdateEvent) and event.final:
+                    finished = True
+                yield response
+                if finished:
                     break
         finally:
             async with self.subscriber_lock:
-                if task_id in self.task_sse_subscribers:
-                    self.task_sse_subscribers[task_id].remove(sse_event_queue)
+                subscribers = self.task_sse_subscribers.get(task_id, [])
+                if sse_event_queue in subscribers:
+                    subscribers.remove(sse_event_queue)
+                abandoned = not finished and not subscribers
+                if not subscribers:
+                    self.task_sse_subscribers.pop(task_id, None)
+
+            if abandoned and self.cancel_on_disconnect and task_id in self.running_agents:
+                logger.info(f"Last SSE subscriber for task {task_id} disconnected, cancelling")
+                self.start_cancellation(task_id)
 
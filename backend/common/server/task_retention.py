@@ -0,0 +1,128 @@
+from collections import OrderedDict
+from typing import Iterable
+from pydantic import BaseModel
+from common.types import TaskState
+from common.server.task_snapshot import TaskSnapshot
+import time
+
+TERMINAL_TASK_STATES = (TaskState.COMPLETED, TaskState.CANCELED, TaskState.FAILED)
+
+
+class TaskRetentionPolicy(BaseModel):
+    """Limits applied to tasks that reached a terminal state.
+
+    Tasks that are still running are never evicted, so the limits may be
+    exceeded while many tasks are in flight.
+    """
+
+    max_tasks: int | None = None
+    terminal_task_ttl: float | None = None
+    max_bytes: int | None = None
+    sweep_interval: float = 30.0
+    archive_path: str | None = None
+
+    @property
+    def enabled(self) -> bool:
+        return (
+            self.max_tasks is not None
+            or self.terminal_task_ttl is not None
+            or self.max_bytes is not None
+        )
+
+
+class TaskRetentionTracker:
+    """Tracks resident tasks and picks which terminal tasks to evict.
+
+    Sizes are approximated by the JSON size of a task when it is first seen
+    plus the JSON size of every message and artifact appended afterwards.
+    They are only measured when the policy has a byte budget. Terminal tasks
+    are kept in least-recently-used order.
+    """
+
+    def __init__(self, policy: TaskRetentionPolicy):
+        self.policy = policy
+        self.task_sizes: dict[str, int] = {}
+        self.resident_bytes = 0
+        self.terminal_tasks: OrderedDict[str, float] = OrderedDict()
+        self.evictions: dict[str, int] = {"ttl": 0, "max_tasks": 0, "max_bytes": 0}
+        self.archived = 0
+
+    def record_write(self, task: TaskSnapshot, added: Iterable[BaseModel] = ()):
+        """Records a write that appended the added messages and artifacts."""
+        if self.policy.max_bytes is None:
+            added_bytes = 0
+            self.task_sizes.setdefault(task.id, 0)
+        elif task.id not in self.task_sizes:
+            added_bytes = len(task.to_task().model_dump_json(exclude_none=True))
+            self.task_sizes[task.id] = 0
+        else:
+            added_bytes = sum(len(item.model_dump_json(exclude_none=True)) for item in added)
+
+        self.task_sizes[task.id] += added_bytes
+        self.resident_bytes += added_bytes
+
+        if task.status.state in TERMINAL_TASK_STATES:
+            if task.id not in self.terminal_tasks:
+                self.terminal_tasks[task.id] = time.monotonic()
+            self.terminal_tasks.move_to_end(task.id)
+        else:
+            self.terminal_tasks.pop(task.id, None)
+
+    def touch(self, task_id: str):
+        if task_id in self.terminal_tasks:
+            self.terminal_tasks.move_to_end(task_id)
+
+    def forget(self, task_id: str):
+        self.resident_bytes -= self.task_sizes.pop(task_id, 0)
+        self.terminal_tasks.pop(task_id, None)
+
+    def select_evictions(self) -> list[tuple[str, str]]:
+        """Returns (task_id, reason) pairs, least recently used first."""
+        evictions = []
+        selected = set()
+
+        if self.policy.terminal_task_ttl is not None:
+            expires_before = time.monotonic() - self.policy.terminal_task_ttl
+            for task_id, terminal_at in self.terminal_tasks.items():
+                if terminal_at < expires_before:
+                    evictions.append((task_id, "ttl"))
+                    selected.add(task_id)
+
+        resident_tasks = len(self.task_sizes) - len(selected)
+        resident_bytes = self.resident_bytes - sum(
+            self.task_sizes.get(task_id, 0) for task_id in selected
+        )
+        for task_id in self.terminal_tasks:
+            if task_id in selected:
+                continue
+
+            if self.policy.max_tasks is not None and resident_tasks > self.policy.max_tasks:
+                reason = "max_tasks"
+            elif self.policy.max_bytes is not None and resident_bytes > self.policy.max_bytes:
+                reason = "max_bytes"
+            else:
+                break
+
+            evictions.append((task_id, reason))
+            resident_tasks -= 1
+            resident_bytes -= self.task_sizes.get(task_id, 0)
+
+        return evictions
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "resident_tasks": len(self.task_sizes),
+            "resident_bytes": self.resident_bytes,
+            "terminal_tasks": len(self.terminal_tasks),
+            "evictions": sum(self.evictions.values()),
+            **{f"evictions_{reason}": count for reason, count in self.evictions.items()},
+            "archived": self.archived,
+        }
+
+
+def append_to_archive(path: str, tasks: list[TaskSnapshot]):
+    """Appends evicted tasks to a JSON lines archive. Runs on a worker thread."""
+    with open(path, "a", encoding="utf-8") as archive:
+        for task in tasks:
+            archive.write(task.to_task().model_dump_json(exclude_none=True))
+            archive.write("\n")
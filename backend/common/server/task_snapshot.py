@@ -0,0 +1,156 @@
+from typing import Any, Iterable
+from common.types import Task, TaskStatus, Message, Artifact
+
+
+def _append_shared(items: list, length: int, new_items: Iterable) -> list:
+    """Appends to an append-only list shared between snapshot versions.
+
+    Older snapshots only look at their own prefix, so appending in place is
+    safe as long as this snapshot is the newest one; otherwise the prefix is
+    copied first.
+    """
+    if len(items) != length:
+        items = items[:length]
+    items.extend(new_items)
+    return items
+
+
+class TaskSnapshot:
+    """Immutable view of a task at one version.
+
+    History and artifacts are stored in lists shared by every version of the
+    task, each snapshot remembering how many entries belong to it. Producing a
+    new version is O(appended items) and reading the last k history entries
+    is O(k); neither copies the whole task.
+    """
+
+    __slots__ = (
+        "id",
+        "session_id",
+        "status",
+        "metadata",
+        "version",
+        "_history",
+        "_history_len",
+        "_artifacts",
+        "_artifacts_len",
+    )
+
+    def __init__(
+        self,
+        id: str,
+        session_id: str | None,
+        status: TaskStatus,
+        history: list[Message] | None = None,
+        artifacts: list[Artifact] | None = None,
+        metadata: dict[str, Any] | None = None,
+        version: int = 1,
+        history_len: int | None = None,
+        artifacts_len: int | None = None,
+    ):
+        self.id = id
+        self.session_id = session_id
+        self.status = status
+        self.metadata = metadata
+        self.version = version
+        self._history = history if history is not None else []
+        self._history_len = len(self._history) if history_len is None else history_len
+        self._artifacts = artifacts
+        self._artifacts_len = (
+            len(artifacts or []) if artifacts_len is None else artifacts_len
+        )
+
+    @classmethod
+    def from_task(cls, task: Task) -> "TaskSnapshot":
+        return cls(
+            id=task.id,
+            session_id=task.sessionId,
+            status=task.status,
+            history=list(task.history or []),
+            artifacts=list(task.artifacts) if task.artifacts is not None else None,
+            metadata=task.metadata,
+            version=task.version or 1,
+        )
+
+    @property
+    def history_length(self) -> int:
+        return self._history_len
+
+    @property
+    def artifacts_length(self) -> int:
+        return self._artifacts_len
+
+    def history_tail(self, length: int) -> list[Message]:
+        if length <= 0:
+            return []
+        return self._history[max(self._history_len - length, 0) : self._history_len]
+
+    def history_since(self, length: int) -> list[Message]:
+        """Returns the messages added after the first length entries."""
+        return self._history[length : self._history_len]
+
+    def artifacts_since(self, length: int) -> list[Artifact]:
+        if self._artifacts is None:
+            return []
+        return self._artifacts[length : self._artifacts_len]
+
+    def with_update(
+        self,
+        status: TaskStatus | None = None,
+        messages: Iterable[Message] = (),
+        artifacts: Iterable[Artifact] | None = None,
+    ) -> "TaskSnapshot":
+        messages = list(messages)
+        history = (
+            _append_shared(self._history, self._history_len, messages)
+            if messages
+            else self._history
+        )
+
+        task_artifacts = self._artifacts
+        artifacts_len = self._artifacts_len
+        if artifacts is not None:
+            artifacts = list(artifacts)
+            task_artifacts = _append_shared(
+                self._artifacts if self._artifacts is not None else [],
+                self._artifacts_len,
+                artifacts,
+            )
+            artifacts_len += len(artifacts)
+
+        return TaskSnapshot(
+            id=self.id,
+            session_id=self.session_id,
+            status=status if status is not None else self.status,
+            history=history,
+            artifacts=task_artifacts,
+            metadata=self.metadata,
+            version=self.version + 1,
+            history_len=self._history_len + len(messages),
+            artifacts_len=artifacts_len,
+        )
+
+    def to_task(self, history_length: int | None = None) -> Task:
+        """Materializes the snapshot, keeping the last history_length messages.
+
+        The full history is included when history_length is None.
+        """
+        history = (
+            self._history[: self._history_len]
+            if history_length is None
+            else self.history_tail(history_length)
+        )
+        artifacts = (
+            self._artifacts[: self._artifacts_len]
+            if self._artifacts is not None
+            else None
+        )
+        return Task.model_construct(
+            id=self.id,
+            sessionId=self.session_id,
+            status=self.status,
+            artifacts=artifacts,
+            history=history,
+            metadata=self.metadata,
+            version=self.version,
+        )
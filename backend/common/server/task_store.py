@@ -0,0 +1,298 @@
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any
+from common.types import Task, PushNotificationConfig
+from common.server.task_snapshot import TaskSnapshot
+import asyncio
+import logging
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class TaskStore(ABC):
+    """Storage backend used by InMemoryTaskManager for tasks and push configs."""
+
+    @abstractmethod
+    async def get_task(self, task_id: str) -> TaskSnapshot | None:
+        pass
+
+    @abstractmethod
+    async def save_task(self, task: TaskSnapshot) -> None:
+        pass
+
+    @abstractmethod
+    async def delete_task(self, task_id: str) -> None:
+        pass
+
+    @abstractmethod
+    async def get_push_notification_info(
+        self, task_id: str
+    ) -> PushNotificationConfig | None:
+        pass
+
+    @abstractmethod
+    async def set_push_notification_info(
+        self, task_id: str, notification_config: PushNotificationConfig
+    ) -> None:
+        pass
+
+    async def close(self) -> None:
+        pass
+
+
+class InMemoryTaskStore(TaskStore):
+    def __init__(self):
+        self.tasks: dict[str, TaskSnapshot] = {}
+        self.push_notification_infos: dict[str, PushNotificationConfig] = {}
+
+    async def get_task(self, task_id: str) -> TaskSnapshot | None:
+        return self.tasks.get(task_id)
+
+    async def save_task(self, task: TaskSnapshot) -> None:
+        self.tasks[task.id] = task
+
+    async def delete_task(self, task_id: str) -> None:
+        self.tasks.pop(task_id, None)
+        self.push_notification_infos.pop(task_id, None)
+
+    async def get_push_notification_info(
+        self, task_id: str
+    ) -> PushNotificationConfig | None:
+        return self.push_notification_infos.get(task_id)
+
+    async def set_push_notification_info(
+        self, task_id: str, notification_config: PushNotificationConfig
+    ) -> None:
+        self.push_notification_infos[task_id] = notification_config
+
+
+# Marks a pending delete in SqliteTaskStore._unflushed.
+_DELETED = object()
+
+
+class SqliteTaskStore(TaskStore):
+    """Durable task store backed by SQLite in WAL mode.
+
+    The most recently used tasks and push configs, up to max_resident each,
+    are kept resident so the hot path rarely touches the database. Writes
+    are serialized on the event loop and handed to a background writer that
+    serializes and commits them in batches on a worker thread; reads of
+    non-resident entries also run on a worker thread. Entries waiting for
+    the writer are always readable, even after leaving the resident set.
+    """
+
+    _SCHEMA = (
+        "CREATE TABLE IF NOT EXISTS tasks ("
+        " id TEXT PRIMARY KEY, data TEXT NOT NULL, updated_at REAL NOT NULL)",
+        "CREATE TABLE IF NOT EXISTS push_notification_infos ("
+        " task_id TEXT PRIMARY KEY, data TEXT NOT NULL)",
+    )
+
+    def __init__(
+        self,
+        path: str,
+        batch_size: int = 256,
+        max_resident: int = 10000,
+        retry_backoff: float = 0.1,
+        max_retry_backoff: float = 5.0,
+        close_retries: int = 3,
+    ):
+        self.path = path
+        self.batch_size = batch_size
+        self.max_resident = max_resident
+        self.retry_backoff = retry_backoff
+        self.max_retry_backoff = max_retry_backoff
+        self.close_retries = close_retries
+        self.write_failures = 0
+        self._closing = False
+        self.tasks: OrderedDict[str, TaskSnapshot] = OrderedDict()
+        self.push_notification_infos: OrderedDict[str, PushNotificationConfig] = OrderedDict()
+        # (kind, key) -> value handed to the writer but not committed yet.
+        self._unflushed: dict[tuple[str, str], Any] = {}
+        self._write_queue: asyncio.Queue | None = None
+        self._writer: asyncio.Task | None = None
+        self._db_lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        for statement in self._SCHEMA:
+            self._conn.execute(statement)
+        self._conn.commit()
+
+    async def get_task(self, task_id: str) -> TaskSnapshot | None:
+        return await self._get(
+            self.tasks, "task", task_id, "SELECT data FROM tasks WHERE id = ?",
+            lambda data: TaskSnapshot.from_task(Task.model_validate_json(data)),
+        )
+
+    async def save_task(self, task: TaskSnapshot) -> None:
+        self._make_resident(self.tasks, task.id, task)
+        # Serialization happens on the writer thread.
+        self._enqueue_write("task", task.id, task)
+
+    async def delete_task(self, task_id: str) -> None:
+        self.tasks.pop(task_id, None)
+        self.push_notification_infos.pop(task_id, None)
+        self._unflushed[("push", task_id)] = _DELETED
+        self._enqueue_write("delete", task_id, _DELETED)
+
+    async def get_push_notification_info(
+        self, task_id: str
+    ) -> PushNotificationConfig | None:
+        return await self._get(
+            self.push_notification_infos, "push", task_id,
+            "SELECT data FROM push_notification_infos WHERE task_id = ?",
+            PushNotificationConfig.model_validate_json,
+        )
+
+    async def set_push_notification_info(
+        self, task_id: str, notification_config: PushNotificationConfig
+    ) -> None:
+        self._make_resident(self.push_notification_infos, task_id, notification_config)
+        self._enqueue_write("push", task_id, notification_config)
+
+    async def _get(self, resident: OrderedDict, kind: str, key: str, query: str, parse):
+        while True:
+            value = resident.get(key)
+            if value is not None:
+                resident.move_to_end(key)
+                return value
+            value = self._unflushed.get((kind, key))
+            if value is not None:
+                return None if value is _DELETED else value
+
+            row = await asyncio.to_thread(self._fetch_one, query, key)
+            # Another coroutine may have written the entry while we were
+            # reading; if so, look again instead of caching the old row.
+            if key in resident or (kind, key) in self._unflushed:
+                continue
+            if row is None:
+                return None
+            value = parse(row[0])
+            self._make_resident(resident, key, value)
+            return value
+
+    def _make_resident(self, resident: OrderedDict, key: str, value: Any):
+        resident[key] = value
+        resident.move_to_end(key)
+        while len(resident) > self.max_resident:
+            resident.popitem(last=False)
+
+    async def close(self) -> None:
+        error = None
+        self._closing = True
+        if self._writer is not None:
+            await self._write_queue.put(None)
+            try:
+                await self._writer
+            except Exception as e:
+                error = e
+            self._writer = None
+
+        with self._db_lock:
+            self._conn.close()
+        if error is not None:
+            raise error
+
+    def _enqueue_write(self, kind: str, key: str, value: Any):
+        if self._writer is None:
+            self._write_queue = asyncio.Queue()
+            self._writer = asyncio.create_task(self._run_writer())
+
+        self._unflushed[("push" if kind == "push" else "task", key)] = value
+        self._write_queue.put_nowait((kind, key, value))
+
+    async def _run_writer(self):
+        stopping = False
+        while not stopping:
+            batch = [await self._write_queue.get()]
+            while len(batch) < self.batch_size and not self._write_queue.empty():
+                batch.append(self._write_queue.get_nowait())
+
+            if None in batch:
+                stopping = True
+                batch = [op for op in batch if op is not None]
+
+            if not batch:
+                continue
+
+            await self._write_with_retry(batch)
+
+            # Committed entries are readable from the database again, unless
+            # they have been written once more since.
+            for kind, key, value in batch:
+                keys = [("task", key), ("push", key)] if kind == "delete" else [(kind, key)]
+                for unflushed_key in keys:
+                    if self._unflushed.get(unflushed_key) is value:
+                        del self._unflushed[unflushed_key]
+
+    async def _write_with_retry(self, batch: list[tuple[str, str, Any]]):
+        # A failed batch is retried until it commits, so it is never dropped
+        # while its entries are still served from _unflushed. Once closing,
+        # it is retried a few times and then reported to the close() caller.
+        backoff = self.retry_backoff
+        attempt = 0
+        while True:
+            try:
+                await asyncio.to_thread(self._write_batch, batch)
+                return
+            except Exception as e:
+                self.write_failures += 1
+                attempt += 1
+                if self._closing and attempt > self.close_retries:
+                    logger.error(
+                        f"Giving up writing {len(batch)} task store updates on close: {e}"
+                    )
+                    raise
+                logger.error(
+                    f"Error while writing {len(batch)} task store updates, "
+                    f"retrying in {backoff:.1f}s: {e}"
+                )
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, self.max_retry_backoff)
+
+    def _write_batch(self, batch: list[tuple[str, str, Any]]):
+        # Only the latest write per key matters within one batch.
+        tasks: dict[str, TaskSnapshot] = {}
+        push_infos: dict[str, PushNotificationConfig] = {}
+        deletes: set[str] = set()
+        for kind, key, data in batch:
+            if kind == "task":
+                tasks[key] = data
+                deletes.discard(key)
+            elif kind == "push":
+                push_infos[key] = data
+            else:
+                tasks.pop(key, None)
+                push_infos.pop(key, None)
+                deletes.add(key)
+
+        now = time.time()
+        with self._db_lock, self._conn:
+            if deletes:
+                keys = [(key,) for key in deletes]
+                self._conn.executemany("DELETE FROM tasks WHERE id = ?", keys)
+                self._conn.executemany(
+                    "DELETE FROM push_notification_infos WHERE task_id = ?", keys
+                )
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO tasks (id, data, updated_at) VALUES (?, ?, ?)",
+                [
+                    (key, task.to_task().model_dump_json(exclude_none=True), now)
+                    for key, task in tasks.items()
+                ],
+            )
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO push_notification_infos (task_id, data) VALUES (?, ?)",
+                [
+                    (key, config.model_dump_json(exclude_none=True))
+                    for key, config in push_infos.items()
+                ],
+            )
+
+    def _fetch_one(self, query: str, key: str):
+        with self._db_lock:
+            return self._conn.execute(query, (key,)).fetchone()
@@ -1,5 +1,5 @@
 from typing import Union, Any
-from pydantic import BaseModel, Field, TypeAdapter
+from pydantic import BaseModel, Field, TypeAdapter, PrivateAttr
 from typing import Literal, List, Annotated, Optional
 from datetime import datetime
 from pydantic import model_validator, ConfigDict, field_serializer
@@ -89,6 +89,24 @@ class Task(BaseModel):
     artifacts: List[Artifact] | None = None
     history: List[Message] | None = None
     metadata: dict[str, Any] | None = None
+    version: int | None = None
+
+
+class TaskDelta(BaseModel):
+    """The changes to a task between baseVersion and version.
+
+    history and artifacts hold only the entries added since baseVersion. A
+    baseVersion of 0 means the delta carries the whole task.
+    """
+
+    id: str
+    sessionId: str | None = None
+    version: int
+    baseVersion: int = 0
+    status: TaskStatus
+    history: List[Message] = []
+    artifacts: List[Artifact] = []
+    metadata: dict[str, Any] | None = None
 
 
 class TaskStatusUpdateEvent(BaseModel):
@@ -115,6 +133,8 @@ class PushNotificationConfig(BaseModel):
     url: str
     token: str | None = None
     authentication: AuthenticationInfo | None = None
+    # Receive TaskDelta payloads instead of the full task on every update.
+    delta: bool = False
 
 
 class TaskIdParams(BaseModel):
@@ -124,6 +144,11 @@ class TaskIdParams(BaseModel):
 
 class TaskQueryParams(TaskIdParams):
     historyLength: int | None = None
+    ifVersion: int | None = None
+
+
+class TaskResubscriptionParams(TaskIdParams):
+    fromSequence: int | None = None
 
 
 class TaskSendParams(BaseModel):
@@ -181,6 +206,8 @@ class SendTaskStreamingRequest(JSONRPCRequest):
 
 class SendTaskStreamingResponse(JSONRPCResponse):
     result: TaskStatusUpdateEvent | TaskArtifactUpdateEvent | None = None
+    # Position in the task event log, sent as the SSE id field.
+    _sequence: int | None = PrivateAttr(default=None)
 
 
 class GetTaskRequest(JSONRPCRequest):
@@ -221,7 +248,7 @@ class GetTaskPushNotificationResponse(JSONRPCResponse):
 
 class TaskResubscriptionRequest(JSONRPCRequest):
     method: Literal["tasks/resubscribe",] = "tasks/resubscribe"
-    params: TaskIdParams
+    params: TaskResubscriptionParams
 
 
 A2ARequest = TypeAdapter(
@@ -302,6 +329,18 @@ class ContentTypeNotSupportedError(JSONRPCError):
     data: None = None
 
 
+class TaskNotModifiedError(JSONRPCError):
+    code: int = -32006
+    message: str = "Task not modified"
+    data: Any | None = None
+
+
+class ServerBusyError(JSONRPCError):
+    code: int = -32007
+    message: str = "Server busy, retry later"
+    data: Any | None = None
+
+
 class AgentProvider(BaseModel):
     organization: str
     url: str | None = None
@@ -3,109 +3,355 @@ import uuid
 from starlette.responses import JSONResponse
 from starlette.requests import Request
 from typing import Any
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 
+import asyncio
 import jwt
 import time
 import json
 import hashlib
+import hmac
 import httpx
 import logging
 
-from jwt import PyJWK, PyJWKClient
+from jwt import PyJWK
+from common.utils.push_url_verifier import PushUrlVerifier
 
 logger = logging.getLogger(__name__)
 AUTH_HEADER_PREFIX = 'Bearer '
 
+# Key parameters for the signing algorithms generate_jwk() supports.
+SIGNING_ALGORITHMS = {
+    "RS256": {"kty": "RSA", "size": 2048},
+    "ES256": {"kty": "EC", "crv": "P-256"},
+    "EdDSA": {"kty": "OKP", "crv": "Ed25519"},
+}
+
 class PushNotificationAuth:
-    def _calculate_request_body_sha256(self, data: dict[str, Any]):
-        """Calculates the SHA256 hash of a request body.
+    @staticmethod
+    def serialize_payload(data: dict[str, Any]) -> bytes:
+        """Serializes a request body to the bytes that are hashed and sent.
 
         This logic needs to be same for both the agent who signs the payload and the client verifier.
         """
-        body_str = json.dumps(
+        return json.dumps(
             data,
             ensure_ascii=False,
             allow_nan=False,
             indent=None,
             separators=(",", ":"),
-        )
-        return hashlib.sha256(body_str.encode()).hexdigest()
-
+        ).encode()
 class PushNotificationSenderAuth(PushNotificationAuth):
-    def __init__(self):
+    """Signs push-notifications and publishes the verification keys.
+
+    Signing runs on a small thread pool so it never blocks the event loop.
+    With a rotation_interval, start() schedules key rotation in the
+    background: the next key is generated and published in the JWKS
+    key_publish_ahead seconds before it replaces the signing key, so
+    receivers that cache the JWKS for that long already know it. The
+    retired public key stays in the JWKS for key_grace_period seconds so
+    notifications signed just before the rotation still verify. Webhook
+    URLs are verified through url_verifier, which caches outcomes.
+    """
+
+    def __init__(
+        self,
+        algorithm: str = "RS256",
+        rotation_interval: float | None = None,
+        key_publish_ahead: float = 300.0,
+        key_grace_period: float = 600.0,
+        max_signing_threads: int = 2,
+        url_verifier: PushUrlVerifier | None = None,
+    ):
+        if algorithm not in SIGNING_ALGORITHMS:
+            raise ValueError(f"Unsupported signing algorithm {algorithm}")
+        self.algorithm = algorithm
+        self.rotation_interval = rotation_interval
+        self.key_publish_ahead = key_publish_ahead
+        self.key_grace_period = key_grace_period
         self.public_keys = []
         self.private_key_jwk: PyJWK = None
+        self._key_created_at = 0.0
+        # Published key that takes over signing at the next rotation.
+        self._next_key: PyJWK | None = None
+        self._next_key_published_at = 0.0
+        # kid -> time the key stopped being used for signing.
+        self._retired_keys: dict[str, float] = {}
+        self._rotation_task: asyncio.Task | None = None
+        self.url_verifier = url_verifier or PushUrlVerifier()
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_signing_threads, thread_name_prefix="push-signing"
+        )
+
+    async def verify_push_notification_url(self, url: str) -> bool:
+        return await self.url_verifier.verify(url)
+
+    def start(self):
+        """Schedules key rotation; call on the event loop once a key exists."""
+        if self.rotation_interval and self._rotation_task is None:
+            self._rotation_task = asyncio.create_task(self._run_key_rotation())
+
+    async def close(self):
+        if self._rotation_task is not None:
+            self._rotation_task.cancel()
+            await asyncio.gather(self._rotation_task, return_exceptions=True)
+            self._rotation_task = None
+        await self.url_verifier.close()
+        self._executor.shutdown(wait=False)
+
+    def generate_jwk(self, algorithm: str | None = None):
+        """Generates a new signing key and publishes its public half.
+
+        The previous signing key, if any, is retired and dropped from the
+        published keys after key_grace_period.
+        """
+        algorithm = algorithm or self.algorithm
+        public_key, private_key = self._create_key(algorithm)
+        self._next_key = None
+        self.public_keys.append(public_key)
+        self._switch_key(private_key)
 
     @staticmethod
-    async def verify_push_notification_url(url: str) -> bool:
-        async with httpx.AsyncClient(timeout=10) as client:
-            try:
-                validation_token = str(uuid.uuid4())
-                response = await client.get(
-                    url,
-                    params={"validationToken": validation_token}
-                )
-                response.raise_for_status()
-                is_verified = response.text == validation_token
+    def _create_key(algorithm: str) -> tuple[dict[str, Any], PyJWK]:
+        if algorithm not in SIGNING_ALGORITHMS:
+            raise ValueError(f"Unsupported signing algorithm {algorithm}")
+
+        key = jwk.JWK.generate(
+            kid=str(uuid.uuid4()), use="sig", alg=algorithm, **SIGNING_ALGORITHMS[algorithm]
+        )
+        return key.export_public(as_dict=True), PyJWK.from_json(key.export_private())
+
+    def _switch_key(self, private_key: PyJWK):
+        now = time.monotonic()
+        if self.private_key_jwk is not None:
+            self._retired_keys[self.private_key_jwk.key_id] = now
+        self.private_key_jwk = private_key
+        self.algorithm = private_key.algorithm_name
+        self._key_created_at = now
+        self._prune_retired_keys()
 
-                logger.info(f"Verified push-notification URL: {url} => {is_verified}")            
-                return is_verified                
+    async def _run_key_rotation(self):
+        while True:
+            await asyncio.sleep(max(self._next_rotation_step() - time.monotonic(), 0.0))
+            try:
+                await self._rotate_keys()
             except Exception as e:
-                logger.warning(f"Error during sending push-notification for URL {url}: {e}")
+                logger.error(f"Could not rotate push-notification signing key: {e}")
+                await asyncio.sleep(min(self.rotation_interval, 60.0))
 
-        return False
+    def _next_rotation_step(self) -> float:
+        """Returns when the next key is due to be published or to sign."""
+        if self._next_key is None:
+            due = self._key_created_at + max(self.rotation_interval - self.key_publish_ahead, 0.0)
+        else:
+            due = max(
+                self._key_created_at + self.rotation_interval,
+                self._next_key_published_at + self.key_publish_ahead,
+            )
+        if self._retired_keys:
+            due = min(due, min(self._retired_keys.values()) + self.key_grace_period)
+        return due
 
-    def generate_jwk(self):
-        key = jwk.JWK.generate(kty='RSA', size=2048, kid=str(uuid.uuid4()), use="sig")
-        self.public_keys.append(key.export_public(as_dict=True))
-        self.private_key_jwk = PyJWK.from_json(key.export_private())
-    
-    def handle_jwks_endpoint(self, _request: Request):
+    async def _rotate_keys(self):
+        now = time.monotonic()
+        if self._next_key is None:
+            if now >= self._key_created_at + self.rotation_interval - self.key_publish_ahead:
+                # Generated on the signing threads; published before it signs.
+                public_key, self._next_key = await asyncio.get_running_loop().run_in_executor(
+                    self._executor, self._create_key, self.algorithm
+                )
+                self._next_key_published_at = time.monotonic()
+                self.public_keys.append(public_key)
+                logger.info(f"Published next push-notification signing key {self._next_key.key_id}")
+        elif now >= max(
+            self._key_created_at + self.rotation_interval,
+            self._next_key_published_at + self.key_publish_ahead,
+        ):
+            logger.info(
+                f"Rotating push-notification signing key {self.private_key_jwk.key_id} "
+                f"to {self._next_key.key_id}"
+            )
+            next_key, self._next_key = self._next_key, None
+            self._switch_key(next_key)
+        self._prune_retired_keys()
+
+    def _prune_retired_keys(self):
+        expired = {
+            kid for kid, retired_at in self._retired_keys.items()
+            if time.monotonic() - retired_at >= self.key_grace_period
+        }
+        if expired:
+            self.public_keys = [key for key in self.public_keys if key["kid"] not in expired]
+            for kid in expired:
+                del self._retired_keys[kid]
+
+    async def handle_jwks_endpoint(self, _request: Request):
         """Allow clients to fetch public keys.
         """
         return JSONResponse({
             "keys": self.public_keys
         })
     
-    def _generate_jwt(self, data: dict[str, Any]):
+    @staticmethod
+    def _sign_body(key: PyJWK, body: bytes):
         """JWT is generated by signing both the request payload SHA digest and time of token generation.
 
         Payload is signed with private key and it ensures the integrity of payload for client.
-        Including iat prevents from replay attack.
+        Including iat and a unique jti prevents from replay attack.
         """
         
         iat = int(time.time())
 
         return jwt.encode(
-            {"iat": iat, "request_body_sha256": self._calculate_request_body_sha256(data)},
-            key=self.private_key_jwk,
-            headers={"kid": self.private_key_jwk.key_id},
-            algorithm="RS256"
+            {
+                "iat": iat,
+                "jti": uuid.uuid4().hex,
+                "request_body_sha256": hashlib.sha256(body).hexdigest(),
+            },
+            key=key,
+            headers={"kid": key.key_id},
+            algorithm=key.algorithm_name
+        )
+
+    def _prepare(self, key: PyJWK, data: dict[str, Any]) -> tuple[bytes, str]:
+        body = self.serialize_payload(data)
+        return body, self._sign_body(key, body)
+
+    async def deliver_push_notification(
+        self, client: httpx.AsyncClient, url: str, data: dict[str, Any]
+    ):
+        """Signs and posts one push-notification, raising if it is not accepted."""
+        # Serialize and sign off the event loop; the signed bytes are sent as is.
+        body, jwt_token = await asyncio.get_running_loop().run_in_executor(
+            self._executor, self._prepare, self.private_key_jwk, data
+        )
+        headers = {
+            'Authorization': f"Bearer {jwt_token}",
+            'Content-Type': "application/json",
+        }
+        response = await client.post(
+            url,
+            content=body,
+            headers=headers
         )
+        response.raise_for_status()
+        logger.info(f"Push-notification sent for URL: {url}")
 
     async def send_push_notification(self, url: str, data: dict[str, Any]):
-        jwt_token = self._generate_jwt(data)
-        headers = {'Authorization': f"Bearer {jwt_token}"}
         async with httpx.AsyncClient(timeout=10) as client: 
             try:
-                response = await client.post(
-                    url,
-                    json=data,
-                    headers=headers
-                )
-                response.raise_for_status()
-                logger.info(f"Push-notification sent for URL: {url}")                            
+                await self.deliver_push_notification(client, url, data)
             except Exception as e:
                 logger.warning(f"Error during sending push-notification for URL {url}: {e}")
 
 class PushNotificationReceiverAuth(PushNotificationAuth):
-    def __init__(self):
+    """Verifies push-notifications signed by PushNotificationSenderAuth.
+
+    The sender's JWKS is cached by kid and fetched again, without blocking
+    the event loop, when it is older than jwks_refresh_interval or a token
+    names a kid it does not have. When a fetch fails, the cached keys keep
+    verifying and only tokens with unknown kids are refused until the next
+    attempt, jwks_min_refresh_interval later. The body digest is taken over
+    the raw request bytes. Every accepted token's jti is remembered until the
+    token expires, so a captured notification cannot be replayed; when more
+    than max_replay_entries are live, the oldest are dropped and tokens
+    issued no later than them are refused.
+    """
+
+    def __init__(
+        self,
+        max_token_age: float = 60 * 5,
+        max_clock_skew: float = 30.0,
+        jwks_refresh_interval: float = 300.0,
+        jwks_min_refresh_interval: float = 10.0,
+        max_replay_entries: int = 100000,
+        timeout: float = 10.0,
+    ):
+        self.max_token_age = max_token_age
+        self.max_clock_skew = max_clock_skew
+        self.jwks_refresh_interval = jwks_refresh_interval
+        self.jwks_min_refresh_interval = jwks_min_refresh_interval
+        self.max_replay_entries = max_replay_entries
+        self.timeout = timeout
+        self.jwks_url: str | None = None
         self.public_keys_jwks = []
-        self.jwks_client = None
+        self._keys: dict[str, PyJWK] = {}
+        self._jwks_fetched_at = float("-inf")
+        self._jwks_failed_at = float("-inf")
+        self._jwks_lock = asyncio.Lock()
+        # jti -> iat of accepted tokens, oldest first.
+        self._seen_tokens: OrderedDict[str, int] = OrderedDict()
+        self._replay_floor = float("-inf")
 
     async def load_jwks(self, jwks_url: str):
-        self.jwks_client = PyJWKClient(jwks_url)
-    
+        self.jwks_url = jwks_url
+        await self._refresh_jwks()
+
+    async def _refresh_jwks(self, requested_at: float | None = None):
+        async with self._jwks_lock:
+            if requested_at is not None and max(
+                self._jwks_fetched_at, self._jwks_failed_at
+            ) > requested_at:
+                # Another verification fetched the keys, or failed to, while we waited.
+                return
+            try:
+                async with httpx.AsyncClient(timeout=self.timeout) as client:
+                    response = await client.get(self.jwks_url)
+                    response.raise_for_status()
+                    jwks = response.json()
+            except Exception:
+                self._jwks_failed_at = time.monotonic()
+                raise
+
+            keys = {}
+            for key in jwks.get("keys", []):
+                if key.get("use", "sig") != "sig" or "kid" not in key:
+                    continue
+                try:
+                    keys[key["kid"]] = PyJWK(key)
+                except jwt.PyJWKError as e:
+                    logger.warning(f"Skipping unusable key {key['kid']} from {self.jwks_url}: {e}")
+            self.public_keys_jwks = jwks.get("keys", [])
+            self._keys = keys
+            self._jwks_fetched_at = time.monotonic()
+
+    async def _get_signing_key(self, kid: str | None) -> PyJWK:
+        now = time.monotonic()
+        age = now - self._jwks_fetched_at
+        if (
+            age >= self.jwks_refresh_interval
+            or (kid not in self._keys and age >= self.jwks_min_refresh_interval)
+        ) and now - self._jwks_failed_at >= self.jwks_min_refresh_interval:
+            try:
+                await self._refresh_jwks(requested_at=now)
+            except Exception as e:
+                # Keys we already have stay valid while the JWKS is unreachable.
+                if kid not in self._keys:
+                    raise
+                logger.warning(f"Could not refresh JWKS from {self.jwks_url}, using cached keys: {e}")
+
+        key = self._keys.get(kid)
+        if key is None:
+            raise ValueError(f"Unknown signing key {kid}")
+        return key
+
+    def _check_replay(self, jti: str, iat: int):
+        now = time.time()
+        while self._seen_tokens:
+            oldest_jti, oldest_iat = next(iter(self._seen_tokens.items()))
+            if now - oldest_iat <= self.max_token_age:
+                break
+            del self._seen_tokens[oldest_jti]
+
+        if jti in self._seen_tokens or iat <= self._replay_floor:
+            raise ValueError("Token was already used")
+
+        self._seen_tokens[jti] = iat
+        while len(self._seen_tokens) > self.max_replay_entries:
+            _, dropped_iat = self._seen_tokens.popitem(last=False)
+            self._replay_floor = max(self._replay_floor, dropped_iat)
+
     async def verify_push_notification(self, request: Request) -> bool:
         auth_header = request.headers.get("Authorization")
         if not auth_header or not auth_header.startswith(AUTH_HEADER_PREFIX):
@@ -113,23 +359,26 @@ class PushNotificationReceiverAuth(PushNotificationAuth):
             return False
         
         token = auth_header[len(AUTH_HEADER_PREFIX):]
-        signing_key = self.jwks_client.get_signing_key_from_jwt(token)
+        signing_key = await self._get_signing_key(jwt.get_unverified_header(token).get("kid"))
 
         decode_token = jwt.decode(
             token,
             signing_key,
-            options={"require": ["iat", "request_body_sha256"]},
-            algorithms=["RS256"],
+            options={"require": ["iat", "jti", "request_body_sha256"]},
+            # Only the key's own algorithm, so a token cannot pick another.
+            algorithms=[signing_key.algorithm_name],
+            leeway=self.max_clock_skew,
         )
 
-        actual_body_sha256 = self._calculate_request_body_sha256(await request.json())
-        if actual_body_sha256 != decode_token["request_body_sha256"]:
+        actual_body_sha256 = hashlib.sha256(await request.body()).hexdigest()
+        if not hmac.compare_digest(actual_body_sha256, decode_token["request_body_sha256"]):
             # Payload signature does not match the digest in signed token.
             raise ValueError("Invalid request body")
         
-        if time.time() - decode_token["iat"] > 60 * 5:
-            # Do not allow push-notifications older than 5 minutes.
+        if time.time() - decode_token["iat"] > self.max_token_age:
+            # Do not allow push-notifications older than max_token_age.
             # This is to prevent replay attack.
             raise ValueError("Token is expired")
-        
+
+        self._check_replay(decode_token["jti"], decode_token["iat"])
         return True
@@ -0,0 +1,128 @@
+from typing import Any
+import asyncio
+import httpx
+import logging
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+
+class VerifiedUrl:
+    def __init__(self, verified: bool, ttl: float):
+        self.verified = verified
+        self.checked_at = time.monotonic()
+        self.expires_at = self.checked_at + ttl
+
+
+class PushUrlVerifier:
+    """Verifies push-notification URLs and remembers the outcome.
+
+    A URL is verified by sending it a validation token, which it must echo
+    back. Successful verifications are cached for ttl seconds and failures
+    for negative_ttl seconds. Concurrent verifications of the same URL share
+    one probe. A cached success that is used within refresh_ahead seconds
+    of its expiry is re-verified in the background, so busy webhooks never
+    wait on a probe after their first task.
+    """
+
+    def __init__(
+        self,
+        ttl: float = 3600.0,
+        negative_ttl: float = 60.0,
+        refresh_ahead: float = 300.0,
+        timeout: float = 10.0,
+        max_entries: int = 10000,
+    ):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.refresh_ahead = min(refresh_ahead, ttl / 2)
+        self.timeout = timeout
+        self.max_entries = max_entries
+        self._verified: dict[str, VerifiedUrl] = {}
+        self._probes: dict[str, asyncio.Task] = {}
+        self._client: httpx.AsyncClient | None = None
+        self.hits = 0
+        self.misses = 0
+        self.probes = 0
+        self.coalesced = 0
+        self.refreshes = 0
+
+    async def verify(self, url: str) -> bool:
+        entry = self._verified.get(url)
+        now = time.monotonic()
+        if entry is not None and now < entry.expires_at:
+            self.hits += 1
+            if entry.verified and entry.expires_at - now <= self.refresh_ahead and url not in self._probes:
+                self.refreshes += 1
+                self._start_probe(url)
+            return entry.verified
+
+        self.misses += 1
+        probe = self._probes.get(url)
+        if probe is None:
+            probe = self._start_probe(url)
+        else:
+            self.coalesced += 1
+        # A caller that gives up must not cancel the probe the others share.
+        return await asyncio.shield(probe)
+
+    def invalidate(self, url: str):
+        self._verified.pop(url, None)
+
+    async def close(self):
+        for probe in list(self._probes.values()):
+            probe.cancel()
+        await asyncio.gather(*self._probes.values(), return_exceptions=True)
+        self._probes.clear()
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def _start_probe(self, url: str) -> asyncio.Task:
+        probe = asyncio.create_task(self._probe(url))
+        self._probes[url] = probe
+        probe.add_done_callback(lambda _: self._probes.pop(url, None))
+        return probe
+
+    async def _probe(self, url: str) -> bool:
+        self.probes += 1
+        if self._client is None:
+            self._client = httpx.AsyncClient(timeout=self.timeout)
+        try:
+            validation_token = str(uuid.uuid4())
+            response = await self._client.get(
+                url,
+                params={"validationToken": validation_token}
+            )
+            response.raise_for_status()
+            is_verified = response.text == validation_token
+            logger.info(f"Verified push-notification URL: {url} => {is_verified}")
+        except Exception as e:
+            logger.warning(f"Error during verifying push-notification URL {url}: {e}")
+            is_verified = False
+
+        self._remember(url, is_verified)
+        return is_verified
+
+    def _remember(self, url: str, verified: bool):
+        self._verified.pop(url, None)
+        if len(self._verified) >= self.max_entries:
+            now = time.monotonic()
+            for expired in [u for u, entry in self._verified.items() if entry.expires_at <= now]:
+                del self._verified[expired]
+            while len(self._verified) >= self.max_entries:
+                # Dicts keep insertion order, so this drops the oldest check.
+                del self._verified[next(iter(self._verified))]
+        self._verified[url] = VerifiedUrl(verified, self.ttl if verified else self.negative_ttl)
+
+    def get_stats(self) -> dict[str, Any]:
+        return {
+            "cached_urls": len(self._verified),
+            "probes_in_flight": len(self._probes),
+            "hits": self.hits,
+            "misses": self.misses,
+            "probes": self.probes,
+            "coalesced": self.coalesced,
+            "refreshes": self.refreshes,
+        }
@@ -0,0 +1,231 @@
+import asyncio
+import json
+import time
+from typing import Any, List
+import httpx
+from common.client import A2ACardResolver, AgentCardCache
+from common.types import AgentCard
+from host.remote_agent_connection import RemoteAgentConnections
+
+
+class AgentUnavailableError(Exception):
+  """Raised when routing to an agent that is unknown or unhealthy."""
+  pass
+
+
+class RegisteredAgent:
+  """A remote agent known to the registry, with its connection and health."""
+
+  def __init__(self, card: AgentCard, address: str | None, etag: str | None = None):
+    self.card = card
+    self.address = address
+    self.etag = etag
+    self.connection = RemoteAgentConnections(card)
+    self.healthy = True
+    self.consecutive_failures = 0
+    self.latency: float | None = None
+    self.last_checked: float | None = None
+    self.last_error: str | None = None
+    # Rendered once here so the prompt listing is only re-joined on changes.
+    self.rendered = json.dumps({"name": card.name, "description": card.description})
+
+
+class AgentRegistry:
+  """Live registry of the remote agents the host can route to.
+
+  A background prober fetches every agent's card periodically, revalidating
+  with the card's ETag so an unchanged agent answers with a cheap 304. The
+  probe records latency; after failure_threshold consecutive failures the
+  agent is marked unhealthy and hidden from the agent list, and the next
+  successful probe restores it. Changed cards replace the agent's
+  connection without a restart.
+  """
+
+  def __init__(
+      self,
+      addresses: List[str],
+      card_cache: AgentCardCache | None = None,
+      probe_interval: float = 30.0,
+      probe_timeout: float = 5.0,
+      failure_threshold: int = 2,
+  ):
+    self.addresses = list(addresses)
+    self.card_cache = card_cache
+    self.probe_interval = probe_interval
+    self.probe_timeout = probe_timeout
+    self.failure_threshold = failure_threshold
+    self.agents: dict[str, RegisteredAgent] = {}
+    self._address_names: dict[str, str] = {}
+    self._retired_connections: list[RemoteAgentConnections] = []
+    self._rendered_agents: str | None = None
+    # Bumped whenever the set of routable agents or their cards change.
+    self.version = 0
+    self._client: httpx.AsyncClient | None = None
+    self._prober: asyncio.Task | None = None
+    if card_cache:
+      for address in self.addresses:
+        card, etag = card_cache.get(address)
+        if card:
+          self.register_agent_card(card, address, etag)
+
+  async def start(self):
+    """Starts probing the agents.
+
+    When cached cards are available the first probe runs in the background;
+    otherwise startup waits for it.
+    """
+    if not self.agents:
+      await self.probe_all()
+      self._prober = asyncio.create_task(self._run_prober(initial_delay=True))
+    else:
+      self._prober = asyncio.create_task(self._run_prober())
+
+  async def close(self):
+    if self._prober and not self._prober.done():
+      self._prober.cancel()
+      try:
+        await self._prober
+      except asyncio.CancelledError:
+        pass
+    for agent in self.agents.values():
+      await agent.connection.close()
+    await self._close_retired_connections()
+    if self._client is not None:
+      await self._client.aclose()
+      self._client = None
+
+  def register_agent_card(
+      self, card: AgentCard, address: str | None = None, etag: str | None = None
+  ) -> RegisteredAgent:
+    previous_names = {card.name}
+    if address in self._address_names:
+      # The agent at this address may have been renamed.
+      previous_names.add(self._address_names[address])
+    for name in previous_names:
+      previous = self.agents.pop(name, None)
+      if previous is not None:
+        # In-flight calls may still use the old connection; close it later.
+        self._retired_connections.append(previous.connection)
+    agent = RegisteredAgent(card, address, etag)
+    self.agents[card.name] = agent
+    if address:
+      self._address_names[address] = card.name
+    self._membership_changed()
+    return agent
+
+  def get_agent(self, name: str) -> RegisteredAgent:
+    """Returns a healthy agent, failing fast if it is unknown or down."""
+    agent = self.agents.get(name)
+    if agent is None:
+      raise AgentUnavailableError(f"Agent {name} not found")
+    if not agent.healthy:
+      raise AgentUnavailableError(
+          f"Agent {name} is unavailable: {agent.last_error or 'health check failed'}")
+    return agent
+
+  def list_agents(self) -> list[RegisteredAgent]:
+    return [agent for agent in self.agents.values() if agent.healthy]
+
+  @property
+  def rendered_agents(self) -> str:
+    if self._rendered_agents is None:
+      self._rendered_agents = '\n'.join(
+          agent.rendered for agent in self.list_agents())
+    return self._rendered_agents
+
+  async def probe_all(self):
+    client = self._get_client()
+    changed = await asyncio.gather(
+        *(self._probe(client, address) for address in self.addresses))
+    if self.card_cache and any(changed):
+      try:
+        await asyncio.to_thread(self.card_cache.save)
+      except OSError as e:
+        print(f"⚠️ Could not write agent card cache: {e}")
+    await self._close_idle_retired_connections()
+
+  async def _probe(self, client: httpx.AsyncClient, address: str) -> bool:
+    """Probes one agent. Returns True when its card changed."""
+    agent = self.agents.get(self._address_names.get(address))
+    started = time.monotonic()
+    try:
+      card, etag = await asyncio.wait_for(
+          A2ACardResolver(address).fetch_agent_card(
+              client, agent.etag if agent else None),
+          self.probe_timeout)
+    except Exception as e:
+      if agent is not None:
+        self._record_failure(agent, e)
+      return False
+
+    changed = card is not None and (agent is None or card != agent.card)
+    if changed:
+      agent = self.register_agent_card(card, address, etag)
+      if self.card_cache:
+        self.card_cache.put(address, card, etag)
+    elif card is not None:
+      agent.etag = etag
+
+    agent.latency = time.monotonic() - started
+    agent.last_checked = time.time()
+    agent.consecutive_failures = 0
+    agent.last_error = None
+    if not agent.healthy:
+      print(f"✅ Agent {agent.card.name} is reachable again")
+      agent.healthy = True
+      self._membership_changed()
+    return changed
+
+  def _record_failure(self, agent: RegisteredAgent, error: Exception):
+    agent.last_checked = time.time()
+    agent.consecutive_failures += 1
+    agent.last_error = repr(error)
+    if agent.healthy and agent.consecutive_failures >= self.failure_threshold:
+      print(f"⚠️ Agent {agent.card.name} marked unhealthy: {agent.last_error}")
+      agent.healthy = False
+      self._membership_changed()
+
+  async def _run_prober(self, initial_delay: bool = False):
+    if initial_delay:
+      await asyncio.sleep(self.probe_interval)
+    while True:
+      try:
+        await self.probe_all()
+      except Exception as e:
+        print(f"❌ Agent probe failed: {e}")
+      await asyncio.sleep(self.probe_interval)
+
+  async def _close_retired_connections(self):
+    retired, self._retired_connections = self._retired_connections, []
+    for connection in retired:
+      await connection.close()
+
+  async def _close_idle_retired_connections(self):
+    # Replaced connections stay open until their in-flight calls finish,
+    # which for a long stream can take several probe intervals.
+    idle = [c for c in self._retired_connections if not c.in_flight]
+    self._retired_connections = [c for c in self._retired_connections if c.in_flight]
+    for connection in idle:
+      await connection.close()
+
+  def _membership_changed(self):
+    self._rendered_agents = None
+    self.version += 1
+
+  def _get_client(self) -> httpx.AsyncClient:
+    if self._client is None:
+      self._client = httpx.AsyncClient(timeout=self.probe_timeout)
+    return self._client
+
+  def get_stats(self) -> dict[str, Any]:
+    return {
+        agent.card.name: {
+            "address": agent.address,
+            "healthy": agent.healthy,
+            "latency": agent.latency,
+            "consecutive_failures": agent.consecutive_failures,
+            "last_checked": agent.last_checked,
+            "last_error": agent.last_error,
+        }
+        for agent in self.agents.values()
+    }
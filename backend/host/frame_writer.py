@@ -0,0 +1,57 @@
+import asyncio
+from collections import OrderedDict, deque
+from typing import Any
+from fastapi import WebSocket
+
+
+class FairFrameWriter:
+  """Sends the frames of concurrent queries on one WebSocket.
+
+  Each query has its own queue and the writer takes one frame from each
+  query with pending frames in turn, so a query that streams many updates
+  cannot hold back the replies of the others. Frames of one query keep
+  their order.
+
+  A query's queue holds at most max_frames frames. send() is called from
+  synchronous callbacks and cannot wait, so when a slow client lets a
+  queue fill up, the oldest progress frame of that query is dropped to
+  make room. Frames marked complete are never dropped; they carry the
+  full response, so the client still ends up with the whole answer.
+  """
+
+  def __init__(self, websocket: WebSocket, max_frames: int = 256):
+    self.websocket = websocket
+    self.max_frames = max_frames
+    self._queues: OrderedDict[str, deque] = OrderedDict()
+    self._ready = asyncio.Event()
+    self.dropped = 0
+
+  def send(self, stream_id: str, frame: dict[str, Any]):
+    queue = self._queues.get(stream_id)
+    if queue is None:
+      queue = self._queues[stream_id] = deque()
+    if len(queue) >= self.max_frames:
+      self._drop_progress_frame(queue)
+    queue.append(frame)
+    self._ready.set()
+
+  def _drop_progress_frame(self, queue: deque):
+    for i, queued in enumerate(queue):
+      if not queued.get("complete"):
+        del queue[i]
+        self.dropped += 1
+        return
+
+  async def run(self):
+    while True:
+      while not self._queues:
+        self._ready.clear()
+        await self._ready.wait()
+
+      stream_id, queue = next(iter(self._queues.items()))
+      frame = queue.popleft()
+      if queue:
+        self._queues.move_to_end(stream_id)
+      else:
+        del self._queues[stream_id]
+      await self.websocket.send_json(frame)
@@ -4,6 +4,7 @@ import functools
 import json
 import uuid
 import threading
+import contextvars
 from typing import List, Optional, Callable
 import os
 import sys
@@ -21,9 +22,11 @@ from google.adk.agents.callback_context import CallbackContext
 from google.adk.tools.tool_context import ToolContext
 from host.remote_agent_connection import (
     RemoteAgentConnections,
+    TaskCallbackArg,
     TaskUpdateCallback
 )
-from common.client import A2ACardResolver
+from common.client import AgentCardCache
+from host.agent_registry import AgentRegistry, AgentUnavailableError
 from common.types import (
     AgentCard,
     Message,
@@ -39,6 +42,19 @@ root_dir = Path(__file__).resolve().parents[3]
 dotenv_path = root_dir / ".env"
 load_dotenv(dotenv_path=dotenv_path)
 
+# Receives (agent name, update) for every remote task update made while
+# handling the current request, e.g. to forward them to a WebSocket.
+task_update_sink: contextvars.ContextVar[
+    Callable[[str, TaskCallbackArg], None] | None
+] = contextvars.ContextVar("task_update_sink", default=None)
+
+class ActiveTask:
+  """A remote task that is waiting for the user's next message."""
+
+  def __init__(self, agent_name: str, task_id: str):
+    self.agent_name = agent_name
+    self.task_id = task_id
+
 class HostAgent:
   """The host agent.
 
@@ -49,30 +65,43 @@ class HostAgent:
   def __init__(
       self,
       remote_agent_addresses: List[str],
-      task_callback: TaskUpdateCallback | None = None
+      task_callback: TaskUpdateCallback | None = None,
+      card_cache_path: str | None = None,
+      card_timeout: float = 5.0,
+      probe_interval: float = 30.0,
+      fanout_timeout: float = 60.0,
   ):
     self.task_callback = task_callback
-    self.remote_agent_connections: dict[str, RemoteAgentConnections] = {}
-    self.cards: dict[str, AgentCard] = {}
-    for address in remote_agent_addresses:
-      card_resolver = A2ACardResolver(address)
-      card = card_resolver.get_agent_card()
-      remote_connection = RemoteAgentConnections(card)
-      self.remote_agent_connections[card.name] = remote_connection
-      self.cards[card.name] = card
-    agent_info = []
-    for ra in self.list_remote_agents():
-      agent_info.append(json.dumps(ra))
-    self.agents = '\n'.join(agent_info)
+    self.fanout_timeout = fanout_timeout
+    # Remote session id -> task waiting for input in that session
+    self.active_tasks: dict[str, ActiveTask] = {}
+    self.registry = AgentRegistry(
+        remote_agent_addresses,
+        card_cache=AgentCardCache(card_cache_path) if card_cache_path else None,
+        probe_interval=probe_interval,
+        probe_timeout=card_timeout,
+    )
+
+  @property
+  def remote_agent_connections(self) -> dict[str, RemoteAgentConnections]:
+    return {name: agent.connection for name, agent in self.registry.agents.items()}
+
+  @property
+  def cards(self) -> dict[str, AgentCard]:
+    return {name: agent.card for name, agent in self.registry.agents.items()}
+
+  @property
+  def agents(self) -> str:
+    return self.registry.rendered_agents
+
+  async def start(self):
+    await self.registry.start()
 
   def register_agent_card(self, card: AgentCard):
-    remote_connection = RemoteAgentConnections(card)
-    self.remote_agent_connections[card.name] = remote_connection
-    self.cards[card.name] = card
-    agent_info = []
-    for ra in self.list_remote_agents():
-      agent_info.append(json.dumps(ra))
-    self.agents = '\n'.join(agent_info)
+    self.registry.register_agent_card(card)
+
+  async def close(self):
+    await self.registry.close()
 
   def create_agent(self) -> Agent:
     return Agent(
@@ -87,6 +116,7 @@ class HostAgent:
         tools=[
             self.list_remote_agents,
             self.send_task,
+            self.send_tasks,
         ],
     )
 
@@ -102,6 +132,8 @@ can use to delegate the task.
 Execution:
 - For actionable tasks, you can use `create_task` to assign tasks to remote agents to perform.
 Be sure to include the remote agent name when you response to the user.
+- When a request needs several agents, use `send_tasks` to send all of their
+tasks at once instead of calling `send_task` for each agent in turn.
 
 You can use `check_pending_task_states` to check the states of the pending
 tasks.
@@ -135,13 +167,10 @@ Current agent: {current_agent['active_agent']}
 
   def list_remote_agents(self):
     """List the available remote agents you can use to delegate the task."""
-    if not self.remote_agent_connections:
-      return []
-
     remote_agent_info = []
-    for card in self.cards.values():
+    for agent in self.registry.list_agents():
       remote_agent_info.append(
-          {"name": card.name, "description": card.description}
+          {"name": agent.card.name, "description": agent.card.description}
       )
     return remote_agent_info
 
@@ -162,20 +191,123 @@ Current agent: {current_agent['active_agent']}
     Yields:
       A dictionary of JSON data.
     """
-    if agent_name not in self.remote_agent_connections:
-      raise ValueError(f"Agent {agent_name} not found")
+    try:
+      client = self.registry.get_agent(agent_name).connection
+    except AgentUnavailableError as e:
+      raise ValueError(str(e)) from e
     state = tool_context.state
     state['agent'] = agent_name
-    card = self.cards[agent_name]
-    client = self.remote_agent_connections[agent_name]
     if not client:
       raise ValueError(f"Client not available for {agent_name}")
-    if 'task_id' in state:
-      taskId = state['task_id']
+    active_task = self.active_tasks.get(state['session_id'])
+    if active_task and active_task.agent_name == agent_name:
+      taskId = active_task.task_id
     else:
       taskId = str(uuid.uuid4())
+    request = self._build_request(taskId, message, state)
+    task = await client.send_task(request, self._task_callback(agent_name))
+    if not isinstance(task, Task):
+      raise ValueError(f"Agent {agent_name} failed: {task.get('error')}")
+    state['task_id'] = task.id
+    state['task_state'] = task.status.state
+    return self._process_task_result(agent_name, task, tool_context)
+
+  async def send_query(
+      self,
+      agent_name: str,
+      query: str,
+      session_id: str,
+      task_id: str | None = None) -> Task:
+    """Forwards a user query straight to a remote agent, bypassing the model."""
+    client = self.registry.get_agent(agent_name).connection
+    request = self._build_request(
+        task_id or str(uuid.uuid4()), query, {'session_id': session_id})
+    task = await client.send_task(request, self._task_callback(agent_name))
+    if not isinstance(task, Task):
+      raise ValueError(f"Agent {agent_name} failed: {task.get('error')}")
+    self._track_task(agent_name, task, session_id)
+    return task
+
+  async def send_tasks(
+      self,
+      agent_names: list[str],
+      messages: list[str],
+      tool_context: ToolContext):
+    """Sends tasks to several remote agents concurrently.
+
+    messages[i] is sent to the agent named agent_names[i]. All tasks share
+    one deadline; results are returned for the agents that answered in time
+    and the others are reported as errors.
+
+    Args:
+      agent_names: The names of the agents to send tasks to.
+      messages: The message to send to each agent, in the same order.
+      tool_context: The tool context this method runs in.
+
+    Returns:
+      A list with one dictionary per agent holding its response or error.
+    """
+    if len(agent_names) != len(messages):
+      raise ValueError("agent_names and messages must have the same length")
+    state = tool_context.state
+
+    async def run(agent_name: str, message: str):
+      client = self.registry.get_agent(agent_name).connection
+      request = self._build_request(str(uuid.uuid4()), message, state)
+      task = await client.send_task(request, self._task_callback(agent_name))
+      if not isinstance(task, Task):
+        raise ValueError(f"Agent {agent_name} failed: {task.get('error')}")
+      return task
+
+    runs = {
+        asyncio.create_task(run(agent_name, message)): agent_name
+        for agent_name, message in zip(agent_names, messages)
+    }
+    pending = set(runs)
+    try:
+      _, pending = await asyncio.wait(runs, timeout=self.fanout_timeout)
+    finally:
+      # Also stops the children when the tool call itself is cancelled.
+      for run_task in pending:
+        run_task.cancel()
+
+    results = []
+    session_active = False
+    for run_task, agent_name in runs.items():
+      if run_task in pending:
+        results.append({"agent": agent_name, "error": "Timed out"})
+        continue
+      try:
+        response = self._process_task_result(
+            agent_name, run_task.result(), tool_context)
+      except Exception as e:
+        results.append({"agent": agent_name, "error": str(e)})
+        continue
+      session_active = session_active or state['session_active']
+      results.append({"agent": agent_name, "response": response})
+    # The session stays active while any of the agents awaits more input.
+    state['session_active'] = session_active
+    return results
+
+  def _task_callback(self, agent_name: str) -> TaskUpdateCallback | None:
+    """Returns the callback for a call to agent_name.
+
+    Updates go to the task_update_sink of the current request, if any, and
+    to the task_callback the host was created with.
+    """
+    sink = task_update_sink.get()
+    if sink is None:
+      return self.task_callback
+
+    def callback(update: TaskCallbackArg):
+      sink(agent_name, update)
+      if self.task_callback:
+        return self.task_callback(update)
+    return callback
+
+  def _build_request(
+      self, task_id: str, message: str, state) -> TaskSendParams:
     sessionId = state['session_id']
-    task: Task
     messageId = ""
     metadata = {}
     if 'input_message_metadata' in state:
@@ -185,8 +317,8 @@ Current agent: {current_agent['active_agent']}
     if not messageId:
       messageId = str(uuid.uuid4())
     metadata.update(**{'conversation_id': sessionId, 'message_id': messageId})
-    request: TaskSendParams = TaskSendParams(
-        id=taskId,
+    return TaskSendParams(
+        id=task_id,
         sessionId=sessionId,
         message=Message(
             role="user",
@@ -197,7 +329,14 @@ Current agent: {current_agent['active_agent']}
         # pushNotification=None,
         metadata={'conversation_id': sessionId},
     )
-    task = await client.send_task(request, self.task_callback)
+
+  def _process_task_result(
+      self, agent_name: str, task: Task, tool_context: ToolContext):
+    state = tool_context.state
+    self._track_task(agent_name, task, state['session_id'])
+    # Keyed by agent, so the results of one send_tasks call do not clobber
+    # each other; assigned anew so the session records the change.
+    state['task_ids'] = {**state.get('task_ids', {}), agent_name: task.id}
     # Assume completion unless a state returns that isn't complete
     state['session_active'] = task.status.state not in [
         TaskState.COMPLETED,
@@ -207,6 +346,7 @@ Current agent: {current_agent['active_agent']}
     ]
     if task.status.state == TaskState.INPUT_REQUIRED:
       # Force user input back
+      state['agent'] = agent_name
       tool_context.actions.skip_summarization = True
       tool_context.actions.escalate = True
     elif task.status.state == TaskState.CANCELED:
@@ -224,6 +364,22 @@ Current agent: {current_agent['active_agent']}
         response.extend(convert_parts(artifact.parts, tool_context))
     return response
 
+  def _track_task(self, agent_name: str, task: Task, session_id: str):
+    """Remembers tasks waiting for input so the follow-up can skip the model."""
+    if task.status.state == TaskState.INPUT_REQUIRED:
+      self.active_tasks[session_id] = ActiveTask(agent_name, task.id)
+      return
+    active_task = self.active_tasks.get(session_id)
+    if active_task and active_task.task_id == task.id:
+      del self.active_tasks[session_id]
+
+def task_text(task: Task) -> str:
+  """Joins the text parts of a task's status message and artifacts."""
+  parts = list(task.status.message.parts) if task.status.message else []
+  for artifact in task.artifacts or []:
+    parts.extend(artifact.parts)
+  return "\n".join(part.text for part in parts if part.type == "text")
+
 def convert_parts(parts: list[Part], tool_context: ToolContext):
   rval = []
   for p in parts:
@@ -24,47 +24,78 @@ class RemoteAgentConnections:
     self.conversation_name = None
     self.conversation = None
     self.pending_tasks = set()
+    # Calls still running; a replaced connection is closed once this is 0.
+    self.in_flight = 0
 
   def get_agent(self) -> AgentCard:
     return self.card
 
+  async def close(self):
+    await self.agent_client.close()
+
   async def send_task(
       self,
       request: TaskSendParams,
       task_callback: TaskUpdateCallback | None,
+  ) -> Task | None:
+    self.in_flight += 1
+    try:
+      return await self._send_task(request, task_callback)
+    finally:
+      self.in_flight -= 1
+
+  async def _send_task(
+      self,
+      request: TaskSendParams,
+      task_callback: TaskUpdateCallback | None,
   ) -> Task | None:
     if self.card.capabilities.streaming:
       print("Streaming")
-      task = None
+      task = Task(
+          id=request.id,
+          sessionId=request.sessionId,
+          status=TaskStatus(
+              state=TaskState.SUBMITTED,
+              message=request.message,
+          ),
+          history=[request.message],
+      )
       if task_callback:
-        task_callback(Task(
-            id=request.id,
-            sessionId=request.sessionId,
-            status=TaskStatus(
-                state=TaskState.SUBMITTED,
-                message=request.message,
-            ),
-            history=[request.message],
-        ))
-      async for response in self.agent_client.send_task_streaming(request.model_dump()):
-        merge_metadata(response.result, request)
-        # For task status updates, we need to propagate metadata and provide
-        # a unique message id.
-        if (hasattr(response.result, 'status') and
-            hasattr(response.result.status, 'message') and
-            response.result.status.message):
-          merge_metadata(response.result.status.message, request.message)
-          m = response.result.status.message
-          if not m.metadata:
-            m.metadata = {}
-          if 'message_id' in m.metadata:
-            m.metadata['last_message_id'] = m.metadata['message_id']
-          m.metadata['message_id'] = str(uuid.uuid4())
-        if task_callback:
-          task = task_callback(response.result)
-        if hasattr(response.result, 'final') and response.result.final:
-          break
-      return response.result
+        task_callback(task)
+      try:
+        async for response in self.agent_client.send_task_streaming(request.model_dump()):
+          if response.error:
+            return {
+                "error": response.error.message,
+                "status": "failed",
+                "agent": self.card.name,
+            }
+          merge_metadata(response.result, request)
+          # For task status updates, we need to propagate metadata and provide
+          # a unique message id.
+          if (hasattr(response.result, 'status') and
+              hasattr(response.result.status, 'message') and
+              response.result.status.message):
+            merge_metadata(response.result.status.message, request.message)
+            m = response.result.status.message
+            if not m.metadata:
+              m.metadata = {}
+            if 'message_id' in m.metadata:
+              m.metadata['last_message_id'] = m.metadata['message_id']
+            m.metadata['message_id'] = str(uuid.uuid4())
+          apply_task_update(task, response.result)
+          if task_callback:
+            task_callback(response.result)
+          if hasattr(response.result, 'final') and response.result.final:
+            break
+      except Exception as e:
+        print(f"❌ Exception in streaming send_task: {str(e)}")
+        return {
+            "error": str(e),
+            "status": "failed",
+            "agent": self.card.name,
+        }
+      return task
     else: # Non-streaming
       try:
         print("🚀 Non-streaming task initiated")
@@ -106,6 +137,24 @@ class RemoteAgentConnections:
             "agent": self.card.name,
         }
 
+def apply_task_update(task: Task, update: TaskStatusUpdateEvent | TaskArtifactUpdateEvent):
+  """Folds a streaming event into the task it belongs to."""
+  if isinstance(update, TaskStatusUpdateEvent):
+    task.status = update.status
+    if update.status.message:
+      task.history = (task.history or []) + [update.status.message]
+    return
+
+  artifact = update.artifact
+  artifacts = task.artifacts or []
+  existing = next((a for a in artifacts if a.index == artifact.index), None)
+  if artifact.append and existing is not None:
+    existing.parts.extend(artifact.parts)
+    existing.lastChunk = artifact.lastChunk
+  else:
+    artifacts.append(artifact)
+  task.artifacts = artifacts
+
 def merge_metadata(target, source):
   if not hasattr(target, 'metadata') or not hasattr(source, 'metadata'):
     return
@@ -0,0 +1,174 @@
+import math
+import re
+import time
+from collections import Counter
+from typing import Any
+from host.agent_registry import AgentRegistry
+
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+_STOPWORDS = frozenset({
+    "a", "an", "and", "are", "at", "be", "can", "for", "from", "give", "how",
+    "i", "in", "is", "it", "me", "of", "on", "or", "please", "s", "tell",
+    "the", "to", "what", "whats", "with", "you",
+})
+
+# How much a term counts depending on where it appears in the card.
+_TAG_WEIGHT = 3.0
+_EXAMPLE_WEIGHT = 2.0
+_NAME_WEIGHT = 1.5
+_DESCRIPTION_WEIGHT = 1.0
+
+
+def tokenize(text: str | None) -> list[str]:
+  if not text:
+    return []
+  return [
+      token for token in _TOKEN_PATTERN.findall(text.lower().replace("'", ""))
+      if token not in _STOPWORDS
+  ]
+
+
+class RouteDecision:
+  """The router's choice for one query."""
+
+  def __init__(self, agent_name: str | None, confidence: float, score: float, routed: bool):
+    self.agent_name = agent_name
+    self.confidence = confidence
+    self.score = score
+    self.routed = routed
+
+
+class SkillRouter:
+  """Routes queries to remote agents without asking the delegator model.
+
+  Every healthy agent is indexed by the terms of its card: skill tags,
+  examples, names and descriptions, weighted in that order and scaled by
+  how few agents share the term. A query's score for an agent is the sum
+  of the weights of the query terms it matches; confidence is the best
+  agent's share of all scores. Queries are routed directly only when both
+  confidence and score clear their thresholds and the best agent matches
+  at least min_matched_terms query terms, one of which comes from its
+  tags, names or descriptions. A lone term ("What's the latest?") or one
+  only seen in an example ("New York") is too little evidence; such
+  queries go to the model.
+
+  For queries that go to the model, record_llm_choice() compares the
+  router's best guess with the agents the model picked, so the threshold
+  can be tuned from the agreement rate.
+  """
+
+  def __init__(
+      self,
+      registry: AgentRegistry,
+      confidence_threshold: float = 0.8,
+      min_score: float = 1.5,
+      min_matched_terms: int = 2,
+  ):
+    self.registry = registry
+    self.confidence_threshold = confidence_threshold
+    self.min_score = min_score
+    self.min_matched_terms = min_matched_terms
+    self._index: dict[str, dict[str, float]] = {}
+    # Terms of each agent that appear outside its skill examples.
+    self._topical_terms: dict[str, set[str]] = {}
+    self._index_version: int | None = None
+    self.routed = 0
+    self.fallbacks = 0
+    self.total_route_time = 0.0
+    self.comparisons = 0
+    self.agreements = 0
+
+  def route(self, query: str) -> RouteDecision:
+    started = time.perf_counter()
+    if self._index_version != self.registry.version:
+      self._build_index()
+
+    scores = Counter()
+    matched: dict[str, set[str]] = {}
+    for term in set(tokenize(query)):
+      for agent_name, weights in self._index.items():
+        if term in weights:
+          scores[agent_name] += weights[term]
+          matched.setdefault(agent_name, set()).add(term)
+
+    total = sum(scores.values())
+    if total:
+      agent_name, score = scores.most_common(1)[0]
+      confidence = score / total
+    else:
+      agent_name, score, confidence = None, 0.0, 0.0
+    routed = (
+        agent_name is not None
+        and confidence >= self.confidence_threshold
+        and score >= self.min_score
+        and len(matched[agent_name]) >= self.min_matched_terms
+        and not matched[agent_name].isdisjoint(self._topical_terms[agent_name])
+    )
+
+    self.total_route_time += time.perf_counter() - started
+    if routed:
+      self.routed += 1
+    else:
+      self.fallbacks += 1
+    return RouteDecision(agent_name, confidence, score, routed)
+
+  def record_llm_choice(self, decision: RouteDecision, agent_names: list[str]):
+    """Records the agents the model delegated to for a query we did not route.
+
+    The router agrees only when the model picked its agent and no other.
+    """
+    if decision.agent_name is None or not agent_names:
+      return
+    self.comparisons += 1
+    if agent_names == [decision.agent_name]:
+      self.agreements += 1
+
+  def _build_index(self):
+    term_weights: dict[str, Counter] = {}
+    topical_terms: dict[str, set[str]] = {}
+    for agent in self.registry.list_agents():
+      card = agent.card
+      weights = Counter()
+      self._add_terms(weights, card.name, _NAME_WEIGHT)
+      self._add_terms(weights, card.description, _DESCRIPTION_WEIGHT)
+      for skill in card.skills:
+        self._add_terms(weights, skill.name, _NAME_WEIGHT)
+        self._add_terms(weights, skill.description, _DESCRIPTION_WEIGHT)
+        for tag in skill.tags or []:
+          self._add_terms(weights, tag, _TAG_WEIGHT)
+      topical_terms[card.name] = set(weights)
+      for skill in card.skills:
+        for example in skill.examples or []:
+          self._add_terms(weights, example, _EXAMPLE_WEIGHT)
+      term_weights[card.name] = weights
+
+    document_frequency = Counter()
+    for weights in term_weights.values():
+      document_frequency.update(weights.keys())
+
+    agent_count = len(term_weights)
+    self._index = {
+        agent_name: {
+            # Repeated terms saturate, and terms shared by agents count less.
+            term: math.log1p(weight) * math.log1p(agent_count / document_frequency[term])
+            for term, weight in weights.items()
+        }
+        for agent_name, weights in term_weights.items()
+    }
+    self._topical_terms = topical_terms
+    self._index_version = self.registry.version
+
+  @staticmethod
+  def _add_terms(weights: Counter, text: str | None, weight: float):
+    for term in set(tokenize(text)):
+      weights[term] += weight
+
+  def get_stats(self) -> dict[str, Any]:
+    decisions = self.routed + self.fallbacks
+    return {
+        "routed": self.routed,
+        "fallbacks": self.fallbacks,
+        "avg_route_time": self.total_route_time / decisions if decisions else 0.0,
+        "llm_comparisons": self.comparisons,
+        "llm_agreement": self.agreements / self.comparisons if self.comparisons else None,
+    }
@@ -10,9 +10,17 @@ from pydantic import BaseModel
 from google.adk.runners import Runner
 from google.adk.sessions import InMemorySessionService
 from google.genai.types import Content, Part
+import asyncio
 import uuid
 import json
-from host_agent import HostAgent
+import time
+import contextlib
+from typing import Callable
+from host_agent import HostAgent, task_text, task_update_sink
+from router import SkillRouter, RouteDecision
+from session_manager import HostSessionManager, HostSession
+from frame_writer import FairFrameWriter
+from common.types import Task, TaskState, TaskStatusUpdateEvent
 
 # 🔄 Ensure root path is in sys.path
 parent_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
@@ -24,8 +32,18 @@ root_dir = Path(__file__).resolve().parents[2]
 dotenv_path = root_dir / ".env"
 load_dotenv(dotenv_path=dotenv_path)
 
+@contextlib.asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Resolve the remote agent cards, in the background if cached ones exist
+    await host.start()
+    session_manager.start()
+    yield
+    await session_manager.close()
+    # Release pooled connections to the remote agents
+    await host.close()
+
 # 🚀 Initialize FastAPI
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 # Add CORS middleware
 app.add_middleware(
@@ -41,28 +59,154 @@ REMOTE_AGENTS = ["http://localhost:10010", "http://localhost:10011"]
 print("🚀 Initializing HostAgent with remote agents:")
 for url in REMOTE_AGENTS:
     print(f"🔗 {url}")
-host = HostAgent(remote_agent_addresses=REMOTE_AGENTS)
+AGENT_CARD_CACHE = os.getenv(
+    "AGENT_CARD_CACHE", str(Path(__file__).resolve().parent / ".agent_cards.json")
+)
+host = HostAgent(remote_agent_addresses=REMOTE_AGENTS, card_cache_path=AGENT_CARD_CACHE)
 adk_agent = host.create_agent()
+# ⚡ Route confident queries straight to an agent, skipping the model
+router = SkillRouter(host.registry)
 
 # 🧠 Wrap in ADK runner
 session_service = InMemorySessionService()
 runner = Runner(agent=adk_agent, app_name="host_app", session_service=session_service)
 
-# Define a consistent session ID to avoid "Session not found" errors
-# This approach uses a fixed session for simplicity
-USER_ID = "user-1"
-SESSION_ID = "host-session-1"
-
-# Initialize the session once at startup
-print(f"Creating persistent session: {SESSION_ID}")
-session_service.create_session(
+# 👥 Sessions are created per user/connection on demand and expire when idle
+DEFAULT_USER_ID = "anonymous"
+session_manager = HostSessionManager(
+    session_service,
     app_name="host_app",
-    user_id=USER_ID,
-    session_id=SESSION_ID
+    idle_ttl=float(os.getenv("HOST_SESSION_TTL", "1800")),
+    max_sessions=int(os.getenv("HOST_MAX_SESSIONS", "1000")),
+    on_evict=lambda session: host.active_tasks.pop(session.session_id, None),
 )
 
+# Per-connection limits for multiplexed WebSocket queries
+WS_MAX_CONCURRENT_QUERIES = int(os.getenv("HOST_WS_MAX_CONCURRENT_QUERIES", "4"))
+WS_MAX_QUERIES = int(os.getenv("HOST_WS_MAX_QUERIES", "16"))
+# Frames queued per query before its oldest progress frames are dropped
+WS_MAX_QUEUED_FRAMES = int(os.getenv("HOST_WS_MAX_QUEUED_FRAMES", "256"))
+
+# Turn latencies, to estimate what the active-agent short-circuit saves
+turn_stats = {
+    "model_turns": 0,
+    "model_time": 0.0,
+    "short_circuit_turns": 0,
+    "short_circuit_time": 0.0,
+}
+
+async def continue_active_task(user_query: str, session: HostSession) -> str | None:
+    """Sends a follow-up straight to the task waiting for the user's input.
+
+    Returns no response when the session has no such task or the call fails,
+    in which case the query goes through the usual routing.
+    """
+    active_task = host.active_tasks.get(session.session_id)
+    if active_task is None:
+        return None
+    started = time.perf_counter()
+    try:
+        task = await host.send_query(
+            active_task.agent_name, user_query, session.session_id, task_id=active_task.task_id)
+    except Exception as e:
+        print(f"⚠️ Follow-up to {active_task.agent_name} failed, using the model: {e}")
+        host.active_tasks.pop(session.session_id, None)
+        return None
+    record_fast_path_state(session, active_task.agent_name, task)
+    turn_stats["short_circuit_turns"] += 1
+    turn_stats["short_circuit_time"] += time.perf_counter() - started
+    print(f"⚡ Follow-up sent to active agent {active_task.agent_name}")
+    return task_text(task) or "⚠️ No response from agent."
+
+def record_fast_path_state(session: HostSession, agent_name: str, task: Task):
+    """Keeps the ADK session in step with a turn that skipped the model.
+
+    Mirrors the state the host agent's send_task tool writes, so the model
+    sees the right active agent on its next turn.
+    """
+    session_manager.update_state(session, {
+        "agent": agent_name,
+        "session_active": task.status.state not in [
+            TaskState.COMPLETED,
+            TaskState.CANCELED,
+            TaskState.FAILED,
+            TaskState.UNKNOWN,
+        ],
+        "task_id": task.id,
+        "task_state": task.status.state,
+    })
+
+def record_model_turn(started: float):
+    turn_stats["model_turns"] += 1
+    turn_stats["model_time"] += time.perf_counter() - started
+
+async def route_directly(
+    user_query: str, session: HostSession) -> tuple[str | None, RouteDecision]:
+    """Answers the query through the skill router.
+
+    Returns no response when the router is not confident or the direct call
+    fails, in which case the query goes to the host model.
+    """
+    decision = router.route(user_query)
+    if not decision.routed:
+        return None, decision
+    try:
+        task = await host.send_query(decision.agent_name, user_query, session.session_id)
+    except Exception as e:
+        print(f"⚠️ Direct routing to {decision.agent_name} failed, using the model: {e}")
+        return None, decision
+    record_fast_path_state(session, decision.agent_name, task)
+    print(f"⚡ Routed directly to {decision.agent_name} (confidence {decision.confidence:.2f})")
+    return task_text(task) or "⚠️ No response from agent.", decision
+
+def delegated_agents(event) -> list[str]:
+    """Returns the agents the host model delegated to in this event."""
+    if not event.content or not event.content.parts:
+        return []
+    for part in event.content.parts:
+        if not part.function_call:
+            continue
+        args = part.function_call.args or {}
+        if part.function_call.name == "send_task" and args.get("agent_name"):
+            return [args["agent_name"]]
+        if part.function_call.name == "send_tasks":
+            return list(args.get("agent_names") or [])
+    return []
+
+@app.get("/metrics")
+async def metrics_handler():
+    """Report routing and short-circuit statistics."""
+    model_turns = turn_stats["model_turns"]
+    short_circuit_turns = turn_stats["short_circuit_turns"]
+    avg_model_time = turn_stats["model_time"] / model_turns if model_turns else None
+    avg_short_circuit_time = (
+        turn_stats["short_circuit_time"] / short_circuit_turns if short_circuit_turns else None
+    )
+    estimated_saved = None
+    if avg_model_time is not None and avg_short_circuit_time is not None:
+        estimated_saved = short_circuit_turns * (avg_model_time - avg_short_circuit_time)
+    return {
+        "router": router.get_stats(),
+        "sessions": session_manager.get_stats(),
+        "turns": {
+            "model_turns": model_turns,
+            "short_circuit_turns": short_circuit_turns,
+            "avg_model_time": avg_model_time,
+            "avg_short_circuit_time": avg_short_circuit_time,
+            "estimated_time_saved": estimated_saved,
+        },
+    }
+
+@app.get("/agents")
+async def agents_handler():
+    """Report the health and probe latency of the remote agents."""
+    return host.registry.get_stats()
+
 class QueryRequest(BaseModel):
     query: str
+    user_id: str | None = None
+    # Omit to start a new session; the response carries its id
+    session_id: str | None = None
 
 @app.post("/query")
 async def query_handler(request: QueryRequest):
@@ -76,32 +220,82 @@ async def query_handler(request: QueryRequest):
     #print("AGENT RESPONSE:")
     #print(content)
     try:
-        final_response = None
-        # Use the persistent session ID instead of generating a new one each time
-        async for event in runner.run_async(user_id=USER_ID, session_id=SESSION_ID, new_message=content):
-            print("Event type:", type(event))
-            print("Event content:", event)
-            for response in event:
-                print(f"📡 Received response: {response}")
-                if hasattr(event, "content") and event.content:
-                    print("Event content:", event.content)
-                    for part in event.content.parts:
-                        if part.text:
-                            print(f"📡 Received response: {part.text}")
-                            final_response = part.text
-
-        return {"response": final_response or "⚠️ No response from agent."}
+        async with session_manager.session(
+            request.user_id or DEFAULT_USER_ID, request.session_id) as session:
+            return await run_query_turn(user_query, content, session)
 
     except Exception as e:
         print(f"❌ Error in FastAPI: {e}")
         return JSONResponse({"error": str(e)}, status_code=500)
 
+async def run_query_turn(user_query: str, content: Content, session: HostSession):
+    follow_up_response = await continue_active_task(user_query, session)
+    if follow_up_response is not None:
+        return {"response": follow_up_response, "session_id": session.session_id}
+
+    direct_response, decision = await route_directly(user_query, session)
+    if direct_response is not None:
+        return {"response": direct_response, "session_id": session.session_id}
+
+    started = time.perf_counter()
+    final_response = None
+    llm_choice = []
+    async for event in runner.run_async(
+        user_id=session.user_id, session_id=session.session_id, new_message=content):
+        llm_choice = delegated_agents(event) or llm_choice
+        print("Event type:", type(event))
+        print("Event content:", event)
+        for response in event:
+            print(f"📡 Received response: {response}")
+            if hasattr(event, "content") and event.content:
+                print("Event content:", event.content)
+                for part in event.content.parts:
+                    if part.text:
+                        print(f"📡 Received response: {part.text}")
+                        final_response = part.text
+
+    record_model_turn(started)
+    router.record_llm_choice(decision, llm_choice)
+    return {
+        "response": final_response or "⚠️ No response from agent.",
+        "session_id": session.session_id,
+    }
+
+def task_update_frame(agent_name: str, update) -> dict:
+    """Builds the WebSocket frame for a remote task update."""
+    if isinstance(update, (Task, TaskStatusUpdateEvent)):
+        parts = update.status.message.parts if update.status.message else []
+        frame = {"state": update.status.state, "final": getattr(update, "final", False)}
+    else:
+        parts = update.artifact.parts
+        frame = {"artifact": update.artifact.index, "final": bool(update.artifact.lastChunk)}
+    return {
+        "status": "agent_update",
+        "agent": agent_name,
+        "task_id": update.id,
+        **frame,
+        "chunk": "".join(part.text for part in parts if part.type == "text"),
+        "complete": False,
+    }
+
 # New WebSocket endpoint
+#
+# Clients may run several queries at once on one socket by tagging each
+# {"query": ...} message with an "id"; every frame of that query carries the
+# id, and {"type": "cancel", "id": ...} cancels it. Queries may also name a
+# "session_id"; queries of one session still run one after another.
 @app.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket):
     """Handle WebSocket connections for streaming agent responses."""
     await websocket.accept()
     print("WebSocket connection established")
+    # Each connection gets its own session unless the client resumes one
+    user_id = websocket.query_params.get("user_id") or DEFAULT_USER_ID
+    session_id = websocket.query_params.get("session_id") or str(uuid.uuid4())
+    writer = FairFrameWriter(websocket, max_frames=WS_MAX_QUEUED_FRAMES)
+    writer_task = asyncio.create_task(writer.run())
+    running: dict[str, asyncio.Task] = {}
+    slots = asyncio.Semaphore(WS_MAX_CONCURRENT_QUERIES)
     
     try:
         while True:
@@ -109,61 +303,141 @@ async def websocket_endpoint(websocket: WebSocket):
             data = await websocket.receive_text()
             try:
                 data_json = json.loads(data)
-                user_query = data_json.get("query", "")
-                
-                if not user_query:
-                    await websocket.send_json({"error": "Missing 'query'"})
-                    continue
-                
-                # Send a message indicating processing has started
-                await websocket.send_json({"status": "processing", "message": "Processing your query..."})
-                
-                # Create the query content
-                content = Content(role="user", parts=[Part(text=user_query)])
-                
-                # Stream responses back to the client
-                response_parts = []
-                async for event in runner.run_async(user_id=USER_ID, session_id=SESSION_ID, new_message=content):
-                    print("WebSocket Event:", type(event))
-                    
-                    if hasattr(event, "content") and event.content:
-                        for part in event.content.parts:
-                            print(f"WebSocket response part: {part}")
-                            print(f"WebSocket response part TEXT: {part.text}")
-                            if part.text:
-                                chunk_text = part.text
-                                print(f"WebSocket response chunk: {chunk_text}")
-                                
-                                # Send each part of the response as it becomes available
-                                await websocket.send_json({
-                                    "status": "chunk", 
-                                    "chunk": chunk_text,
-                                    "complete": False
-                                })
-                                response_parts.append(chunk_text)
-                
-                # Send a complete message with the full response
-                full_response = "".join(response_parts) if response_parts else "⚠️ No response from agent."
-                await websocket.send_json({
-                    "status": "complete",
-                    "response": full_response,
-                    "complete": True
-                })
-                
             except json.JSONDecodeError:
-                await websocket.send_json({"error": "Invalid JSON"})
-            except Exception as e:
-                print(f"❌ Error in agent processing: {e}")
-                await websocket.send_json({
+                writer.send("", {"error": "Invalid JSON"})
+                continue
+            if not isinstance(data_json, dict):
+                writer.send("", {"error": "Expected a JSON object"})
+                continue
+
+            query_id = str(data_json.get("id") or uuid.uuid4())
+            if data_json.get("type") == "cancel":
+                if query_id in running:
+                    running[query_id].cancel()
+                continue
+
+            user_query = data_json.get("query", "")
+            if not user_query or not isinstance(user_query, str):
+                writer.send(query_id, {"id": query_id, "error": "Missing 'query'"})
+                continue
+            if query_id in running:
+                writer.send(query_id, {"id": query_id, "error": "Query id already in use"})
+                continue
+            if len(running) >= WS_MAX_QUERIES:
+                writer.send(query_id, {
+                    "id": query_id,
                     "status": "error",
-                    "error": str(e),
+                    "error": "Too many queries in progress on this connection",
                     "complete": True
                 })
+                continue
+
+            query = asyncio.create_task(run_websocket_query(
+                writer, slots, query_id, user_query,
+                user_id, data_json.get("session_id") or session_id))
+            running[query_id] = query
+            query.add_done_callback(lambda _, query_id=query_id: running.pop(query_id, None))
     
     except WebSocketDisconnect:
         print("WebSocket disconnected")
     except Exception as e:
         print(f"❌ Unexpected WebSocket error: {e}")
+    finally:
+        for query in running.values():
+            query.cancel()
+        writer_task.cancel()
+
+async def run_websocket_query(
+    writer: FairFrameWriter,
+    slots: asyncio.Semaphore,
+    query_id: str,
+    user_query: str,
+    user_id: str,
+    session_id: str):
+    def send(frame: dict):
+        writer.send(query_id, {"id": query_id, **frame})
+
+    try:
+        async with slots:
+            # Send a message indicating processing has started
+            send({
+                "status": "processing",
+                "message": "Processing your query...",
+                "session_id": session_id,
+            })
+            async with session_manager.session(user_id, session_id) as session:
+                await run_websocket_turn(send, user_query, session)
+    except asyncio.CancelledError:
+        send({"status": "cancelled", "complete": True})
+        raise
+    except Exception as e:
+        print(f"❌ Error in agent processing: {e}")
+        send({
+            "status": "error",
+            "error": str(e),
+            "complete": True
+        })
+
+async def run_websocket_turn(send: Callable[[dict], None], user_query: str, session: HostSession):
+    # Forward remote agent progress as it arrives instead of waiting for the model
+    sink_token = task_update_sink.set(
+        lambda agent_name, update: send(task_update_frame(agent_name, update)))
+    try:
+        await answer_websocket_turn(send, user_query, session)
+    finally:
+        task_update_sink.reset(sink_token)
+
+async def answer_websocket_turn(send: Callable[[dict], None], user_query: str, session: HostSession):
+    direct_response = await continue_active_task(user_query, session)
+    decision = None
+    if direct_response is None:
+        direct_response, decision = await route_directly(user_query, session)
+    if direct_response is not None:
+        send({
+            "status": "complete",
+            "response": direct_response,
+            "complete": True
+        })
+        return
+
+    # Create the query content
+    content = Content(role="user", parts=[Part(text=user_query)])
+
+    # Stream responses back to the client
+    response_parts = []
+    llm_choice = []
+    started = time.perf_counter()
+    async for event in runner.run_async(
+        user_id=session.user_id, session_id=session.session_id, new_message=content):
+        llm_choice = delegated_agents(event) or llm_choice
+        print("WebSocket Event:", type(event))
+
+        if hasattr(event, "content") and event.content:
+            for part in event.content.parts:
+                print(f"WebSocket response part: {part}")
+                print(f"WebSocket response part TEXT: {part.text}")
+                if part.text:
+                    chunk_text = part.text
+                    print(f"WebSocket response chunk: {chunk_text}")
+
+                    # Send each part of the response as it becomes available
+                    send({
+                        "status": "chunk", 
+                        "chunk": chunk_text,
+                        "complete": False
+                    })
+                    response_parts.append(chunk_text)
+
+    record_model_turn(started)
+    router.record_llm_choice(decision, llm_choice)
+
+    # Send a complete message with the full response
+    full_response = "".join(response_parts) if response_parts else "⚠️ No response from agent."
+    send({
+        "status": "complete",
+        "response": full_response,
+        "complete": True
+    })
 
 # Add this block to run via `python server.py`
 if __name__ == "__main__":
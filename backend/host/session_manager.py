@@ -0,0 +1,160 @@
+import asyncio
+import contextlib
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Callable
+from google.adk.events import Event, EventActions
+from google.adk.sessions import BaseSessionService
+
+
+class HostSession:
+  """One user's conversation with the host agent."""
+
+  def __init__(self, user_id: str, session_id: str):
+    self.user_id = user_id
+    self.session_id = session_id
+    # Serializes the turns of this session; other sessions run in parallel.
+    self.lock = asyncio.Lock()
+    self.last_used = time.monotonic()
+    # Turns running or waiting on the lock; such sessions are never evicted.
+    self.in_use = 0
+
+
+class HostSessionManager:
+  """Creates host sessions on demand and expires them.
+
+  Sessions idle for longer than idle_ttl are removed by a background sweep.
+  When more than max_sessions exist, the least recently used idle ones are
+  evicted. Evicted sessions are deleted from the ADK session service and
+  on_evict is called so per-session host state can be dropped too.
+  """
+
+  def __init__(
+      self,
+      session_service: BaseSessionService,
+      app_name: str,
+      idle_ttl: float = 1800.0,
+      max_sessions: int = 1000,
+      sweep_interval: float = 60.0,
+      on_evict: Callable[[HostSession], None] | None = None,
+  ):
+    self.session_service = session_service
+    self.app_name = app_name
+    self.idle_ttl = idle_ttl
+    self.max_sessions = max_sessions
+    self.sweep_interval = sweep_interval
+    self.on_evict = on_evict
+    self.sessions: OrderedDict[tuple[str, str], HostSession] = OrderedDict()
+    self._sweeper: asyncio.Task | None = None
+    self.created = 0
+    self.evicted_idle = 0
+    self.evicted_lru = 0
+
+  def start(self):
+    if self._sweeper is None:
+      self._sweeper = asyncio.create_task(self._run_sweeper())
+
+  async def close(self):
+    if self._sweeper is not None:
+      self._sweeper.cancel()
+      try:
+        await self._sweeper
+      except asyncio.CancelledError:
+        pass
+      self._sweeper = None
+
+  @contextlib.asynccontextmanager
+  async def session(
+      self, user_id: str, session_id: str | None = None
+  ) -> AsyncIterator[HostSession]:
+    """Holds the session for one turn, creating it if needed."""
+    session = self._get_or_create(user_id, session_id or str(uuid.uuid4()))
+    session.in_use += 1
+    try:
+      async with session.lock:
+        session.last_used = time.monotonic()
+        yield session
+    finally:
+      session.in_use -= 1
+      session.last_used = time.monotonic()
+
+  def update_state(self, session: HostSession, state_delta: dict[str, Any]):
+    """Writes state for a turn that did not go through the runner.
+
+    The change is appended as an event, so the ADK session records it the
+    same way as state written by the host agent's tools.
+    """
+    adk_session = self.session_service.get_session(
+        app_name=self.app_name, user_id=session.user_id, session_id=session.session_id)
+    if adk_session is None:
+      return
+    self.session_service.append_event(adk_session, Event(
+        author="host",
+        invocation_id=str(uuid.uuid4()),
+        actions=EventActions(state_delta=state_delta),
+    ))
+
+  def _get_or_create(self, user_id: str, session_id: str) -> HostSession:
+    key = (user_id, session_id)
+    session = self.sessions.get(key)
+    if session is not None:
+      self.sessions.move_to_end(key)
+      return session
+
+    # The host session id doubles as the session id sent to the remote
+    # agents, so tasks started by the model and by the fast paths share it.
+    self.session_service.create_session(
+        app_name=self.app_name,
+        user_id=user_id,
+        session_id=session_id,
+        state={"session_id": session_id},
+    )
+    session = self.sessions[key] = HostSession(user_id, session_id)
+    self.created += 1
+    self._evict_lru()
+    return session
+
+  def _evict_lru(self):
+    overflow = len(self.sessions) - self.max_sessions
+    if overflow <= 0:
+      return
+    for key in [key for key, session in self.sessions.items() if not session.in_use]:
+      if overflow <= 0:
+        break
+      self._evict(key)
+      self.evicted_lru += 1
+      overflow -= 1
+
+  def sweep(self):
+    deadline = time.monotonic() - self.idle_ttl
+    for key in [
+        key for key, session in self.sessions.items()
+        if not session.in_use and session.last_used < deadline
+    ]:
+      self._evict(key)
+      self.evicted_idle += 1
+
+  def _evict(self, key: tuple[str, str]):
+    session = self.sessions.pop(key)
+    try:
+      self.session_service.delete_session(
+          app_name=self.app_name, user_id=session.user_id, session_id=session.session_id)
+    except Exception as e:
+      print(f"⚠️ Could not delete session {session.session_id}: {e}")
+    if self.on_evict:
+      self.on_evict(session)
+
+  async def _run_sweeper(self):
+    while True:
+      await asyncio.sleep(self.sweep_interval)
+      self.sweep()
+
+  def get_stats(self) -> dict[str, Any]:
+    return {
+        "sessions": len(self.sessions),
+        "in_use": sum(1 for session in self.sessions.values() if session.in_use),
+        "created": self.created,
+        "evicted_idle": self.evicted_idle,
+        "evicted_lru": self.evicted_lru,
+    }